@@ -8,23 +8,30 @@ Usage:
 - Set MEDIA_ROOT env var if you keep media on another drive.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash, Response, jsonify
+from flask import Flask, render_template, request, redirect, url_for, send_file, flash, Response, jsonify, stream_with_context
 from flask_wtf import FlaskForm
 from flask_wtf.csrf import CSRFProtect
 from wtforms import StringField, IntegerField, SelectField, TextAreaField, BooleanField, validators
-import sqlite3, os, csv, io, shutil, json, zipfile, tempfile
+import sqlite3, os, csv, io, shutil, json, zipfile, tempfile, threading, base64, re, itertools, math, unicodedata, zlib, gzip, codecs, time, uuid, mimetypes
+from urllib.parse import urlencode, quote
+from collections import OrderedDict, Counter, defaultdict
+from contextlib import contextmanager
+import click
+import importlib.util
 from werkzeug.utils import secure_filename
-from datetime import datetime
-from fuzzywuzzy import fuzz  # pip install fuzzywuzzy python-levenshtein
-import requests
-from bs4 import BeautifulSoup
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Image, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from collections import Counter
-from datetime import datetime
+from werkzeug.security import safe_join
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from datetime import datetime, date
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+# PDF export, social sync/scraping and fuzzy matching live in pdf_export.py,
+# social_sync.py and name_matching.py; they are imported on first use so
+# reportlab, requests, bs4 and fuzzywuzzy stay out of startup time and worker RSS.
+# Pillow is likewise only imported by render_thumbnail.
 # Optional: Try to import APScheduler for automated backups
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
@@ -32,6 +39,8 @@ try:
 except ImportError:
     SCHEDULER_AVAILABLE = False
     print("APScheduler not installed. Automated backups disabled. Install with: pip install apscheduler")
+# Optional: Pillow for resized thumbnails (/thumb); falls back to the original file without it
+PIL_AVAILABLE = importlib.util.find_spec('PIL') is not None  # located, not imported
   # Should be already
 # --------------------------
 # Config
@@ -40,14 +49,34 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
 DB_PATH = os.getenv('DB_PATH', os.path.join(BASE_DIR, 'actresses.db'))
 TWITTER_BEARER = os.getenv('TWITTER_BEARER')  # For Twitter API v2
+SOCIAL_SYNC_TTL_HOURS = float(os.getenv('SOCIAL_SYNC_TTL_HOURS', '24'))  # bulk sync skips profiles refreshed more recently
+SOCIAL_SYNC_WORKERS = int(os.getenv('SOCIAL_SYNC_WORKERS', '8'))
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')  # use DELETE if DB_PATH is on a network share
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
 ALLOWED_IMAGE_EXT = {'png', 'jpg', 'jpeg', 'gif'}
+VIDEO_EXT = {'mp4', 'm4v', 'mov', 'avi', 'mkv', 'wmv', 'webm', 'flv'}
 DELETE_MEDIA_ON_REMOVE = os.getenv('DELETE_MEDIA_ON_REMOVE', 'false').lower() in ('1','true','yes')
 RECYCLE_BIN = os.path.join(MEDIA_ROOT, 'recycle_bin')
 BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+BACKUP_STORE_DIR = os.path.join(BACKUP_DIR, 'store')  # content-addressed media blobs shared by all backups
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', '14'))     # newest backups kept by prune_backups (0 keeps all)
+THUMB_CACHE_DIR = os.getenv('THUMB_CACHE_DIR', os.path.join(BASE_DIR, 'thumb_cache'))
+THUMB_CACHE_MAX_BYTES = int(os.getenv('THUMB_CACHE_MAX_MB', '512')) * 1024 * 1024
+THUMB_SIZES = (64, 128, 200, 400, 800)  # requested sizes are rounded up to one of these
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(BASE_DIR, 'pdf_cache'))
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_MB', '256')) * 1024 * 1024
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0')) or None  # catalog render pool; None = one per CPU
+MEDIA_MAX_AGE = int(os.getenv('MEDIA_MAX_AGE', '3600'))  # plain /media URLs; revalidated by ETag after this
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 86400                    # /media URLs carrying the file's ?v=media_version
+MEDIA_OFFLOAD = os.getenv('MEDIA_OFFLOAD', '').lower()   # '', 'x-accel' (nginx) or 'x-sendfile' (Apache, lighttpd)
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_media/')  # nginx `internal` location aliased to MEDIA_ROOT
 
 os.makedirs(MEDIA_ROOT, exist_ok=True)
 os.makedirs(RECYCLE_BIN, exist_ok=True)
 os.makedirs(BACKUP_DIR, exist_ok=True)
+os.makedirs(BACKUP_STORE_DIR, exist_ok=True)
+os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+os.makedirs(PDF_CACHE_DIR, exist_ok=True)
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET', 'b3f2830d075ba2c3f090cad51d29c6659bde518b9fc8276c4ee3bc175a579ead')
@@ -57,6 +86,16 @@ app.config['WTF_CSRF_ENABLED'] = True
 # Initialize CSRF protection
 csrf = CSRFProtect(app)
 
+def protect_api_post():
+    """
+    CSRF check for JSON API routes marked @csrf.exempt so scripts can call them
+    without a token. A cross-site page cannot send an application/json body
+    without a CORS preflight, so JSON requests pass; anything else, including a
+    bodiless POST, must carry csrf_token or an X-CSRFToken header.
+    """
+    if not request.is_json:
+        csrf.protect()
+
 # --------------------------
 # Dropdown options (customize if you want)
 # --------------------------
@@ -80,11 +119,85 @@ STATUS_OPTIONS = ['Active','Inactive','Retired']
 # --------------------------
 # DB helpers
 # --------------------------
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+# One connection per thread (and per process, so forked pool workers never share
+# a handle), reused across requests. Writes made through get_conn() during a
+# request join one transaction that is committed in end_request_transaction.
+_local = threading.local()
+
+def _open_conn():
+    conn = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+    conn.execute('PRAGMA synchronous=NORMAL')  # durable with WAL, one fsync per checkpoint instead of per commit
+    conn.execute('PRAGMA cache_size=-32000')   # ~32 MB page cache
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    return conn
+
+def _db_file_id():
+    try:
+        st = os.stat(DB_PATH)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+def get_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        conn = _open_conn()
+        _local.conn, _local.pid, _local.file_id = conn, os.getpid(), _db_file_id()
     return conn
 
+def reopen_if_db_replaced():
+    """
+    Drop this thread's connection if DB_PATH now names another file (replaced on
+    disk, by any process) so the next get_conn() opens the new one. Called once
+    per unit of work (request, job, outermost transaction()) rather than on every
+    get_conn(); a transaction still open here is rolled back, never closed over.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.pid != os.getpid():
+        return
+    file_id = _db_file_id()
+    if file_id is None or file_id == _local.file_id:
+        return
+    if conn.in_transaction:
+        app.logger.warning('Rolling back an open transaction on %s, which was replaced on disk', DB_PATH)
+        conn.rollback()
+    conn.close()
+    _local.conn = None
+
+def close_conn():
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
+
+@contextmanager
+def transaction():
+    """Commit/rollback boundary for work outside a request (CLI commands, scheduler jobs)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or not conn.in_transaction:
+        reopen_if_db_replaced()
+    conn = get_conn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback(); raise
+    conn.commit()
+
+@app.before_request
+def begin_request():
+    reopen_if_db_replaced()
+
+@app.teardown_request
+def end_request_transaction(exc):
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid() and conn.in_transaction:
+        if exc is None: conn.commit()
+        else: conn.rollback()
+
 # list of columns we want in the final schema (name + many fields)
 DESIRED_COLUMNS = [
     ('id','INTEGER PRIMARY KEY AUTOINCREMENT'),
@@ -123,27 +236,84 @@ DESIRED_COLUMNS = [
     ('sexual_orientation','TEXT'),
     ('bdsm_orientation','TEXT'),
     ('description','TEXT'),
-    ('folder_name','TEXT')
+    ('folder_name','TEXT'),
+    # parsed from height/weight/measurements on every write (see normalized_measures)
+    ('height_cm','REAL'),
+    ('weight_kg','REAL'),
+    ('bust_cm','REAL'),
+    ('waist_cm','REAL'),
+    ('hips_cm','REAL'),
+    ('name_key','TEXT'),  # normalize_name(name), for duplicate checks and import matching
+    ('dob_iso','TEXT')    # parse_dob(dob) as YYYY-MM-DD; age is derived from it (see dob_fields, refresh_ages)
 ]
+MEASURE_COLUMNS = ('height_cm', 'weight_kg', 'bust_cm', 'waist_cm', 'hips_cm')
+
+# Index name -> column list. Text sort columns are indexed COLLATE NOCASE to match
+# build_filter_sql's ORDER BY; equality filters lead composites that end in the
+# default sort, so "status = ? ORDER BY name" is a single index walk.
+# tests/test_query_plans.py verifies every filter/sort combination is served by these.
+ACTRESS_INDEXES = {
+    'idx_actresses_name': 'name COLLATE NOCASE',
+    'idx_actresses_age': 'age',
+    'idx_actresses_country': 'country COLLATE NOCASE',
+    'idx_actresses_height_cm': 'height_cm',
+    'idx_actresses_weight_kg': 'weight_kg',
+    'idx_actresses_measurements': 'bust_cm, waist_cm, hips_cm',
+    'idx_actresses_status': 'status, name COLLATE NOCASE',
+    'idx_actresses_ethnicity': 'ethnicity, name COLLATE NOCASE',
+    'idx_actresses_occupation': 'occupation_category, name COLLATE NOCASE',
+    'idx_actresses_folder_name': 'folder_name',
+    'idx_actresses_name_key': 'name_key',
+    'idx_actresses_birthday': 'substr(dob_iso, 6, 5)',  # MM-DD, for refresh_ages' birthday window
+}
 
-def ensure_schema():
-    """
-    Creates table if missing and adds missing columns using ALTER TABLE.
-    This preserves existing data.
-    """
-    conn = get_conn(); cur = conn.cursor()
-    # create table if not exists with minimal columns (id,name) - we'll add others later
-    cur.execute('''
-    CREATE TABLE IF NOT EXISTS actresses (
-      id INTEGER PRIMARY KEY AUTOINCREMENT,
-      name TEXT NOT NULL
-    );
-    ''')
-    conn.commit()
+# dimension -> (value expression, condition for a row to be counted), with {r}
+# standing for old/new in triggers or the table itself in rebuild_dashboard_counts
+DASHBOARD_DIMENSIONS = {
+    'total': ("''", '1'),
+    'age': ('{r}.age', '{r}.age IS NOT NULL'),
+    'ethnicity': ('{r}.ethnicity', "{r}.ethnicity IS NOT NULL AND {r}.ethnicity != ''"),
+    'occupation_category': ('{r}.occupation_category', "{r}.occupation_category IS NOT NULL AND {r}.occupation_category != ''"),
+    'status': ('{r}.status', '{r}.status IS NOT NULL'),
+    'with_media': ('1', 'COALESCE({r}.has_pictures, 0) OR COALESCE({r}.has_videos, 0)'),
+}
 
+def dashboard_trigger_sql():
+    def add(dim, r):
+        value, cond = (x.format(r=r) for x in DASHBOARD_DIMENSIONS[dim])
+        return (f"INSERT INTO dashboard_counts (dimension, value, count) SELECT '{dim}', {value}, 1 WHERE {cond} "
+                f"ON CONFLICT(dimension, value) DO UPDATE SET count = count + 1;")
+    def remove(dim, r):
+        value, cond = (x.format(r=r) for x in DASHBOARD_DIMENSIONS[dim])
+        return (f"UPDATE dashboard_counts SET count = count - 1 WHERE dimension = '{dim}' AND value = {value} AND ({cond}); "
+                f"DELETE FROM dashboard_counts WHERE dimension = '{dim}' AND value = {value} AND count <= 0;")
+    bump = "UPDATE data_versions SET version = version + 1 WHERE name = 'dashboard';"
+    sql = [
+        f"CREATE TRIGGER IF NOT EXISTS dashboard_insert AFTER INSERT ON actresses BEGIN {' '.join(add(d, 'new') for d in DASHBOARD_DIMENSIONS)} {bump} END;",
+        f"CREATE TRIGGER IF NOT EXISTS dashboard_delete AFTER DELETE ON actresses BEGIN {' '.join(remove(d, 'old') for d in DASHBOARD_DIMENSIONS)} {bump} END;",
+    ]
+    for dim, (value, cond) in DASHBOARD_DIMENSIONS.items():
+        if dim == 'total': continue
+        cols = ', '.join(sorted({c for c in ('age', 'ethnicity', 'occupation_category', 'status', 'has_pictures', 'has_videos') if '{r}.' + c in value + cond}))
+        changed = f"{value.format(r='old')} IS NOT {value.format(r='new')} OR ({cond.format(r='old')}) IS NOT ({cond.format(r='new')})"
+        sql.append(f"CREATE TRIGGER IF NOT EXISTS dashboard_update_{dim} AFTER UPDATE OF {cols} ON actresses WHEN {changed} "
+                   f"BEGIN {remove(dim, 'old')} {add(dim, 'new')} {bump} END;")
+    return '\n'.join(sql)
+
+def rebuild_dashboard_counts():
+    cur = get_conn().cursor()
+    cur.execute('DELETE FROM dashboard_counts')
+    for dim, (value, cond) in DASHBOARD_DIMENSIONS.items():
+        value, cond = value.format(r='actresses'), cond.format(r='actresses')
+        group_by = f' GROUP BY {value}' if value.startswith('actresses.') else ''
+        cur.execute(f"INSERT INTO dashboard_counts (dimension, value, count) SELECT '{dim}', {value}, COUNT(*) FROM actresses WHERE {cond}{group_by} HAVING COUNT(*) > 0")
+    cur.execute("UPDATE data_versions SET version = version + 1 WHERE name = 'dashboard'")
+
+def _add_missing_columns(cur):
     # find existing columns
     cur.execute("PRAGMA table_info('actresses')")
     existing = [r['name'] for r in cur.fetchall()]
+    added = []
 
     # iterate desired columns, add if missing
     for col, coldef in DESIRED_COLUMNS:
@@ -153,37 +323,309 @@ def ensure_schema():
             try:
                 sql = f"ALTER TABLE actresses ADD COLUMN {col} {coldef}"
                 cur.execute(sql)
-                conn.commit()
+                added.append(col)
                 print("Added column:", col)
             except Exception as e:
                 print("Failed to add column", col, ":", e)
+    return added
 
+def _migrate_actresses(cur):
+    # create table if not exists with minimal columns (id,name) - we'll add others later
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS actresses (
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      name TEXT NOT NULL
+    );
+    ''')
+    added = _add_missing_columns(cur)
+
+    if 'height_cm' in added:
+        cur.execute('SELECT id, height, weight, measurements FROM actresses')
+        rows = [dict(r) for r in cur.fetchall()]
+        cur.executemany(f"UPDATE actresses SET {', '.join(c + '=:' + c for c in MEASURE_COLUMNS)} WHERE id=:id",
+                        [dict(normalized_measures(r), id=r['id']) for r in rows])
+    _sync_actress_indexes(cur)
+
+def _sync_actress_indexes(cur):
+    # Secondary indexes: create the designed set, drop ones that were removed from it
+    cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='actresses' AND name LIKE 'idx_actresses_%'")
+    for r in cur.fetchall():
+        if r['name'] not in ACTRESS_INDEXES:
+            cur.execute(f'DROP INDEX IF EXISTS {r["name"]}')
+    for name, cols in ACTRESS_INDEXES.items():
+        cur.execute(f'CREATE INDEX IF NOT EXISTS {name} ON actresses({cols})')
+
+FTS_COLUMNS = ('name', 'aka', 'description', 'tags', 'profession', 'specialties')
+_fts_cols = ', '.join(FTS_COLUMNS)
+_fts_new = ', '.join('new.' + c for c in FTS_COLUMNS)
+_fts_old = ', '.join('old.' + c for c in FTS_COLUMNS)
+# External-content sync: the index follows every write to actresses, so no
+# code path writes actresses_fts directly. 'delete' needs the old values.
+FTS_TRIGGERS = {
+    'actresses_fts_insert': f'''
+    CREATE TRIGGER IF NOT EXISTS actresses_fts_insert AFTER INSERT ON actresses BEGIN
+      INSERT INTO actresses_fts (rowid, {_fts_cols}) VALUES (new.id, {_fts_new});
+    END''',
+    'actresses_fts_delete': f'''
+    CREATE TRIGGER IF NOT EXISTS actresses_fts_delete AFTER DELETE ON actresses BEGIN
+      INSERT INTO actresses_fts (actresses_fts, rowid, {_fts_cols}) VALUES ('delete', old.id, {_fts_old});
+    END''',
+    'actresses_fts_update': f'''
+    CREATE TRIGGER IF NOT EXISTS actresses_fts_update AFTER UPDATE OF {_fts_cols} ON actresses BEGIN
+      INSERT INTO actresses_fts (actresses_fts, rowid, {_fts_cols}) VALUES ('delete', old.id, {_fts_old});
+      INSERT INTO actresses_fts (rowid, {_fts_cols}) VALUES (new.id, {_fts_new});
+    END''',
+}
+
+def _migrate_fts(cur):
     # FTS5 virtual table for search - enhanced with more fields
     # Check if FTS exists and has all required columns
     cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='actresses_fts'")
-    fts_exists = cur.fetchone() is not None
-    if fts_exists:
+    if cur.fetchone() is not None:
         cur.execute("PRAGMA table_info('actresses_fts')")
         fts_columns = [r['name'] for r in cur.fetchall()]
-        if 'profession' not in fts_columns or 'specialties' not in fts_columns:
+        if any(c not in fts_columns for c in FTS_COLUMNS):
             print("FTS table missing columns, recreating...")
             cur.execute('DROP TABLE IF EXISTS actresses_fts')
-            fts_exists = False
 
-    if not fts_exists:
-        cur.execute('''
-        CREATE VIRTUAL TABLE IF NOT EXISTS actresses_fts USING fts5(
-            name, aka, description, tags, profession, specialties, content='actresses', content_rowid='id'
-        );
+    cur.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS actresses_fts USING fts5({', '.join(FTS_COLUMNS)}, content='actresses', content_rowid='id')")
+    for sql in FTS_TRIGGERS.values():
+        cur.execute(sql)
+    rebuild_search_index()
+
+def rebuild_search_index():
+    """Re-reads every row into actresses_fts. Only migrations and `flask rebuild-search-index` call this."""
+    get_conn().execute("INSERT INTO actresses_fts (actresses_fts) VALUES ('rebuild')")
+
+@contextmanager
+def deferred_fts_inserts(conn):
+    """
+    Bulk-insert window: inside one write transaction the FTS insert trigger is
+    dropped, the caller records new ids in temp.fts_pending, and on exit they are
+    indexed with a single INSERT ... SELECT and the trigger is restored. Any error
+    rolls the whole transaction back, trigger included.
+    """
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+    try:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS fts_pending (id INTEGER PRIMARY KEY)')
+        conn.execute('DELETE FROM temp.fts_pending')
+        conn.execute('DROP TRIGGER IF EXISTS actresses_fts_insert')
+        yield
+        conn.execute(f'''INSERT INTO actresses_fts (rowid, {_fts_cols})
+                         SELECT a.id, {', '.join('a.' + c for c in FTS_COLUMNS)} FROM temp.fts_pending p JOIN actresses a ON a.id = p.id''')
+        conn.execute('DELETE FROM temp.fts_pending')
+        conn.execute(FTS_TRIGGERS['actresses_fts_insert'])
+    except BaseException:
+        conn.rollback()
+        raise
+
+def _migrate_media_catalog(cur):
+    # Media catalog: one row per file under MEDIA_ROOT/<folder>/, plus the
+    # folder mtime seen at the last scan so rescans only re-list changed folders
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS media_files (
+      folder TEXT NOT NULL,
+      filename TEXT NOT NULL,
+      kind TEXT NOT NULL,
+      size INTEGER,
+      mtime REAL,
+      is_thumbnail INTEGER DEFAULT 0,
+      PRIMARY KEY (folder, filename)
+    ) WITHOUT ROWID;
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_files_folder_kind ON media_files(folder, kind, is_thumbnail)')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS media_folders (
+      folder TEXT PRIMARY KEY,
+      mtime REAL
+    ) WITHOUT ROWID;
+    ''')
+
+def _migrate_data_versions(cur):
+    # Change counters: bumped by triggers on every write so caches (e.g. filter counts)
+    # can tell whether their entry is still current without re-running the query
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS data_versions (
+      name TEXT PRIMARY KEY,
+      version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    ''')
+    cur.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('actresses', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS actresses_version_{event.lower()} AFTER {event} ON actresses BEGIN
+          UPDATE data_versions SET version = version + 1 WHERE name = 'actresses';
+        END;
         ''')
 
-    # Populate/Sync FTS
-    cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) SELECT id, name, aka, description, tags, profession, specialties FROM actresses')
-    conn.commit()
-    conn.close()
+def _migrate_tags(cur):
+    # Normalized tag index (see parse_tags) with per-tag counts kept by triggers
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='actress_tags'")
+    tags_exist = cur.fetchone() is not None
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS actress_tags (
+      actress_id INTEGER NOT NULL,
+      tag TEXT NOT NULL,
+      PRIMARY KEY (actress_id, tag)
+    ) WITHOUT ROWID;
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_actress_tags_tag ON actress_tags(tag, actress_id)')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS tag_counts (
+      tag TEXT PRIMARY KEY,
+      count INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_tag_counts_count ON tag_counts(count DESC, tag)')
+    cur.executescript('''
+    CREATE TRIGGER IF NOT EXISTS actress_tags_count_insert AFTER INSERT ON actress_tags BEGIN
+      INSERT INTO tag_counts (tag, count) VALUES (new.tag, 1)
+        ON CONFLICT(tag) DO UPDATE SET count = count + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS actress_tags_count_delete AFTER DELETE ON actress_tags BEGIN
+      UPDATE tag_counts SET count = count - 1 WHERE tag = old.tag;
+      DELETE FROM tag_counts WHERE tag = old.tag AND count <= 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS actresses_tags_delete AFTER DELETE ON actresses BEGIN
+      DELETE FROM actress_tags WHERE actress_id = old.id;
+    END;
+    ''')
+    if not tags_exist:
+        rebuild_tag_index()
 
-# run migration on startup
-ensure_schema()
+def _migrate_dashboard(cur):
+    # Dashboard aggregates (dimension, value) -> count, kept by triggers; see DASHBOARD_DIMENSIONS
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='dashboard_counts'")
+    dashboard_exists = cur.fetchone() is not None
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS dashboard_counts (
+      dimension TEXT NOT NULL,
+      value NOT NULL,
+      count INTEGER NOT NULL,
+      PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID;
+    ''')
+    cur.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('dashboard', 0)")
+    cur.executescript(dashboard_trigger_sql())
+    if not dashboard_exists:
+        rebuild_dashboard_counts()
+
+def _migrate_media_scan(cur):
+    # first run after the catalog was introduced: index whatever is on disk
+    cur.execute('SELECT 1 FROM media_folders LIMIT 1')
+    if cur.fetchone() is None:
+        rescan_media()
+
+def _migrate_merge_candidates(cur):
+    # Near-duplicate detection (see refresh_merge_candidates): trigram postings of
+    # normalized names, scored pairs (id1 < id2), and a queue of rows to rescore
+    cur.executescript('''
+    CREATE TABLE IF NOT EXISTS name_trigrams (
+      trigram TEXT NOT NULL,
+      actress_id INTEGER NOT NULL,
+      PRIMARY KEY (trigram, actress_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_name_trigrams_actress ON name_trigrams(actress_id);
+    CREATE TABLE IF NOT EXISTS merge_candidates (
+      id1 INTEGER NOT NULL,
+      id2 INTEGER NOT NULL,
+      score INTEGER NOT NULL,
+      PRIMARY KEY (id1, id2)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_merge_candidates_score ON merge_candidates(score DESC, id1, id2);
+    CREATE INDEX IF NOT EXISTS idx_merge_candidates_id2 ON merge_candidates(id2);
+    CREATE TABLE IF NOT EXISTS merge_dirty (
+      actress_id INTEGER PRIMARY KEY
+    );
+    CREATE TRIGGER IF NOT EXISTS merge_dirty_insert AFTER INSERT ON actresses BEGIN
+      INSERT OR IGNORE INTO merge_dirty (actress_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS merge_dirty_update AFTER UPDATE OF name ON actresses WHEN old.name IS NOT new.name BEGIN
+      INSERT OR IGNORE INTO merge_dirty (actress_id) VALUES (new.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS merge_candidates_delete AFTER DELETE ON actresses BEGIN
+      DELETE FROM name_trigrams WHERE actress_id = old.id;
+      DELETE FROM merge_candidates WHERE id1 = old.id OR id2 = old.id;
+      DELETE FROM merge_dirty WHERE actress_id = old.id;
+    END;
+    ''')
+    # everything starts out queued; the first refresh does one full pass
+    cur.execute('INSERT OR IGNORE INTO merge_dirty (actress_id) SELECT id FROM actresses')
+
+def _migrate_name_key(cur):
+    # name_key column + index, backfilled along with name_trigrams for every row
+    _add_missing_columns(cur)
+    _sync_actress_indexes(cur)
+    rows = cur.execute('SELECT id, name FROM actresses').fetchall()
+    cur.executemany('UPDATE actresses SET name_key=? WHERE id=?', [(normalize_name(r['name']), r['id']) for r in rows])
+    sync_name_trigrams(rows)
+
+def _migrate_social_sync(cur):
+    # last follower counts per profile, and when they were fetched (see sync_social_profiles)
+    cur.executescript('''
+    CREATE TABLE IF NOT EXISTS social_sync (
+      actress_id INTEGER PRIMARY KEY,
+      synced_at REAL NOT NULL,
+      twitter_followers INTEGER,
+      ig_followers INTEGER,
+      error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_social_sync_synced ON social_sync(synced_at);
+    CREATE TRIGGER IF NOT EXISTS social_sync_delete AFTER DELETE ON actresses BEGIN
+      DELETE FROM social_sync WHERE actress_id = old.id;
+    END;
+    ''')
+
+def _migrate_dob_iso(cur):
+    # dob_iso column + birthday index, backfilled once; ages brought in line with it
+    _add_missing_columns(cur)
+    _sync_actress_indexes(cur)
+    cur.execute("CREATE TABLE IF NOT EXISTS task_runs (task TEXT PRIMARY KEY, ran_on TEXT NOT NULL)")
+    rows = cur.execute("SELECT id, dob FROM actresses WHERE dob IS NOT NULL AND TRIM(dob) != ''").fetchall()
+    cur.executemany('UPDATE actresses SET dob_iso=? WHERE id=?', [(parse_dob(r['dob']), r['id']) for r in rows])
+    refresh_ages(full=True)
+
+def _migrate_gallery_sorts(cur):
+    # keyset pagination of one folder's images by mtime or size (see gallery_page);
+    # the primary key already orders a folder by filename
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_files_mtime ON media_files(folder, kind, mtime, filename)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_media_files_size ON media_files(folder, kind, size, filename)')
+
+# Schema migrations as (version, step). ensure_schema runs every step above the
+# database's PRAGMA user_version and records the new version after each one.
+# Steps are idempotent, so databases from before versioning (user_version 0,
+# also any restored dump) are brought up safely. Append new steps; never renumber.
+MIGRATIONS = [
+    (1, _migrate_actresses),
+    (2, _migrate_fts),
+    (3, _migrate_media_catalog),
+    (4, _migrate_data_versions),
+    (5, _migrate_tags),
+    (6, _migrate_dashboard),
+    (7, _migrate_media_scan),
+    (8, _migrate_merge_candidates),
+    (9, _migrate_name_key),
+    (10, _migrate_social_sync),
+    (11, _migrate_dob_iso),
+    (12, _migrate_gallery_sorts),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def ensure_schema():
+    """
+    Applies pending MIGRATIONS. On an up-to-date database this only reads
+    PRAGMA user_version; no table is touched.
+    """
+    conn = get_conn(); cur = conn.cursor()
+    version = cur.execute('PRAGMA user_version').fetchone()[0]
+    for target, migrate in MIGRATIONS:
+        if version >= target:
+            continue
+        migrate(cur)
+        cur.execute(f'PRAGMA user_version = {target}')
+        conn.commit()
+        print(f"Schema migrated to version {target} ({migrate.__name__})")
 
 # --------------------------
 # Forms for validation (Feature 8)
@@ -235,35 +677,377 @@ def allowed_file(filename):
 def safe_folder_name(name: str) -> str:
     return secure_filename(name).strip() or 'unknown'
 
+def parse_tags(text):
+    """
+    Normalized tags from a tags field or filter: '#'-prefixed words when the text
+    has any (e.g. '#blonde #tall'), otherwise comma-separated items. Lowercased.
+    """
+    if not text: return []
+    if '#' in text:
+        items = [w for w in text.split() if w.startswith('#')]
+    else:
+        items = text.split(',')
+    tags = []
+    for item in items:
+        tag = ' '.join(item.strip('#, .').split()).lower()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+
+def normalize_name(name):
+    """Casefolded, accent-stripped, whitespace-collapsed form of a name for comparisons."""
+    name = name or ''
+    if not name.isascii():
+        name = unicodedata.normalize('NFKD', name)
+        name = ''.join(c for c in name if not unicodedata.combining(c))
+    return ' '.join(name.casefold().split())
+
+def name_trigrams(name):
+    """Set of padded trigrams of normalize_name(name) ('  a', ' al', 'ali', ...)."""
+    padded = f'  {normalize_name(name)} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def sync_name_trigrams(rows, new=False):
+    """
+    Replace the name_trigrams postings for [(id, name), ...]; called wherever names
+    are written. new=True skips the delete for freshly inserted ids.
+    """
+    cur = get_conn().cursor()
+    if not new:
+        cur.executemany('DELETE FROM name_trigrams WHERE actress_id=?', [(r[0],) for r in rows])
+    # sorted to insert in primary-key order: far fewer B-tree page splits on big batches
+    postings = sorted((g, r[0]) for r in rows for g in name_trigrams(r[1]))
+    cur.executemany('INSERT OR IGNORE INTO name_trigrams (trigram, actress_id) VALUES (?, ?)', postings)
+
+def resolve_names(names):
+    """{name_key: row} for existing actresses matching any of names, in one indexed query."""
+    return resolve_name_keys(normalize_name(n) for n in names if n)
+
+def resolve_name_keys(keys):
+    keys = sorted(set(keys))
+    if not keys: return {}
+    cur = get_conn().cursor()
+    cur.execute('SELECT a.id, a.name, a.name_key FROM json_each(?) k JOIN actresses a ON a.name_key = k.value',
+                (json.dumps(keys),))
+    return {r['name_key']: r for r in cur.fetchall()}
+
+def find_similar_names(name, exclude_id=None, min_score=85, limit=5):
+    """
+    (exact, similar) rows for a candidate name: same name_key, and the best other
+    names scoring above min_score, looked up through name_trigrams rather than a scan.
+    """
+    from name_matching import name_ratio
+    key = normalize_name(name)
+    cur = get_conn().cursor()
+    cur.execute('SELECT id, name FROM actresses WHERE name_key=? AND id IS NOT ?', (key, exclude_id))
+    exact = cur.fetchall()
+    grams = name_trigrams(key)
+    marks = ','.join('?' * len(grams))
+    cur.execute(f'''
+    SELECT a.id, a.name, a.name_key FROM name_trigrams t JOIN actresses a ON a.id = t.actress_id
+    WHERE t.trigram IN ({marks}) AND t.actress_id IS NOT ? AND a.name_key != ?
+    GROUP BY a.id HAVING COUNT(*) >= ?
+    ''', [*grams, exclude_id, key, max(_min_shared(grams), 1)])
+    scored = [(name_ratio(key, r['name_key']), r) for r in cur.fetchall() if _dice_ok(grams, name_trigrams(r['name_key']))]
+    similar = [r for score, r in sorted(scored, key=lambda x: -x[0]) if score > min_score][:limit]
+    return exact, similar
+
+def _num(text):
+    return float(text.replace(',', '.'))
+
+def parse_height_cm(text):
+    """
+    Height in cm from free text: 5'7", 5 ft 7 in, 170 cm, 1.70 m, 67 in.
+    Bare numbers are read as cm from 100 up, inches from 48, feet below 8.
+    """
+    if not text: return None
+    t = str(text).lower().strip()
+    m = re.match(r"^(\d+(?:\.\d+)?)\s*(?:'|′|ft|feet|foot)\s*(?:(\d+(?:\.\d+)?)\s*(?:\"|″|''|in|inches)?)?", t)
+    if m:
+        cm = _num(m.group(1)) * 30.48 + (_num(m.group(2)) * 2.54 if m.group(2) else 0)
+    else:
+        m = re.search(_NUMBER + r'\s*(cm|m|in|inches|"|″)?', t)
+        if not m: return None
+        value, unit = _num(m.group(1)), m.group(2)
+        if unit == 'cm': cm = value
+        elif unit == 'm': cm = value * 100
+        elif unit: cm = value * 2.54
+        elif value >= 100: cm = value
+        elif value >= 48: cm = value * 2.54
+        elif value < 8: cm = value * 30.48
+        else: return None
+    return round(cm, 1) if 100 <= cm <= 250 else None
+
+def parse_weight_kg(text):
+    """Weight in kg from '55 kg', '120 lbs', '120 lb'; bare numbers of 100+ are read as lbs."""
+    if not text: return None
+    m = re.search(_NUMBER + r'\s*(kg|kgs|kilos?|lbs?|pounds?)?', str(text).lower())
+    if not m: return None
+    value, unit = _num(m.group(1)), m.group(2) or ''
+    kg = value * 0.45359237 if unit.startswith(('lb', 'pound')) or (not unit and value >= 100) else value
+    return round(kg, 1) if 25 <= kg <= 250 else None
+
+def parse_measurements_cm(text):
+    """(bust, waist, hips) in cm from '34C-24-36', '86/61/91 cm'; inches unless marked cm or bust > 60."""
+    if not text: return None, None, None
+    t = str(text).lower()
+    nums = re.findall(r'(\d+(?:[.,]\d+)?)\s*[a-k]{0,3}\s*(?=[-/x]|$|\s|cm|in|")', t)
+    if len(nums) < 3: return None, None, None
+    values = [_num(n) for n in nums[:3]]
+    inches = 'in' in t or '"' in t or ('cm' not in t and values[0] <= 60)
+    return tuple(round(v * 2.54 if inches else v, 1) for v in values)
+
+def normalized_measures(data):
+    """MEASURE_COLUMNS values parsed from a row/form dict's height, weight and measurements."""
+    bust, waist, hips = parse_measurements_cm(data.get('measurements'))
+    return {
+        'height_cm': parse_height_cm(data.get('height')),
+        'weight_kg': parse_weight_kg(data.get('weight')),
+        'bust_cm': bust, 'waist_cm': waist, 'hips_cm': hips,
+    }
+
+_DOB_YMD = re.compile(r'(\d{4})[/.-](\d{1,2})[/.-](\d{1,2})')
+_DOB_DMY = re.compile(r'(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})')
+
+def _iso_date(y, m, d):
+    if not 1900 <= y <= date.today().year: return None
+    try:
+        return date(y, m, d).isoformat()
+    except ValueError:
+        return None
+
+def parse_dob(text):
+    """'YYYY-MM-DD' from '1990-05-20', '20.05.1990', '05/20/1990', '19900520', '20051990' etc., else None."""
+    if not text: return None
+    raw = str(text).strip()
+    if m := _DOB_YMD.fullmatch(raw):
+        return _iso_date(int(m[1]), int(m[2]), int(m[3]))
+    if m := _DOB_DMY.fullmatch(raw):
+        a, b, y = int(m[1]), int(m[2]), int(m[3])
+        return _iso_date(y, b, a) or _iso_date(y, a, b)  # day-first, else US month-first
+    if raw.isdigit() and len(raw) == 8:
+        return _iso_date(int(raw[:4]), int(raw[4:6]), int(raw[6:])) or _iso_date(int(raw[4:]), int(raw[2:4]), int(raw[:2]))
+    # last resort: the first three numbers as year, month, day; two-digit years are 19xx/20xx
+    numbers = re.findall(r'\d+', raw)
+    if len(numbers) >= 3:
+        y, m, d = (int(n) for n in numbers[:3])
+        if y < 100: y += 1900 if y >= 50 else 2000
+        return _iso_date(y, m, d)
+    return None
+
+def age_from_dob(dob_iso, today=None):
+    today = today or date.today()
+    y, m, d = (int(p) for p in dob_iso.split('-'))
+    return today.year - y - ((today.month, today.day) < (m, d))
+
+def dob_fields(data):
+    """dob_iso parsed from a row/form dict's dob, and the age it implies (the given age when dob doesn't parse)."""
+    dob_iso = parse_dob(data.get('dob'))
+    return {'dob_iso': dob_iso, 'age': age_from_dob(dob_iso) if dob_iso else data.get('age')}
+
+# age as of :today from dob_iso, in SQL; matches age_from_dob
+AGE_SQL = ("CAST(strftime('%Y', :today) AS INTEGER) - CAST(substr(dob_iso, 1, 4) AS INTEGER)"
+           " - (strftime('%m-%d', :today) < substr(dob_iso, 6, 5))")
+
+def refresh_ages(full=False, today=None):
+    """
+    Bring age in line with dob_iso in one UPDATE. An incremental run only looks at
+    rows whose birthday (MM-DD, via idx_actresses_birthday) fell after the last
+    run and on or before today; the first run, or one a year or more after the
+    last, checks every row. Returns the number of ages changed.
+    """
+    today = today or date.today()
+    cur = get_conn().cursor()
+    row = cur.execute("SELECT ran_on FROM task_runs WHERE task='refresh_ages'").fetchone()
+    last = date.fromisoformat(row[0]) if row else None
+    where = f'dob_iso IS NOT NULL AND age IS NOT ({AGE_SQL})'
+    params = {'today': today.isoformat()}
+    if not full and last and 0 <= (today - last).days < 365:
+        params.update(since=last.strftime('%m-%d'), until=today.strftime('%m-%d'))
+        joiner = 'AND' if params['since'] <= params['until'] else 'OR'  # OR: the window wraps past Dec 31
+        where += f' AND (substr(dob_iso, 6, 5) > :since {joiner} substr(dob_iso, 6, 5) <= :until)'
+    changed = cur.execute(f'UPDATE actresses SET age = {AGE_SQL} WHERE {where}', params).rowcount
+    cur.execute("INSERT OR REPLACE INTO task_runs (task, ran_on) VALUES ('refresh_ages', ?)", (today.isoformat(),))
+    return changed
+
+def sync_actress_tags(actress_id, tags_text):
+    """Bring actress_tags for one profile in line with its tags field (tag_counts follows via triggers)."""
+    cur = get_conn().cursor()
+    new = set(parse_tags(tags_text))
+    cur.execute('SELECT tag FROM actress_tags WHERE actress_id=?', (actress_id,))
+    old = {r['tag'] for r in cur.fetchall()}
+    cur.executemany('DELETE FROM actress_tags WHERE actress_id=? AND tag=?', [(actress_id, t) for t in old - new])
+    cur.executemany('INSERT INTO actress_tags (actress_id, tag) VALUES (?, ?)', [(actress_id, t) for t in new - old])
+
+def rebuild_tag_index():
+    cur = get_conn().cursor()
+    cur.execute('DELETE FROM actress_tags')
+    cur.execute('DELETE FROM tag_counts')
+    cur.execute("SELECT id, tags FROM actresses WHERE tags IS NOT NULL AND tags != ''")
+    cur.executemany('INSERT OR IGNORE INTO actress_tags (actress_id, tag) VALUES (?, ?)',
+                    [(r['id'], t) for r in cur.fetchall() for t in parse_tags(r['tags'])])
+
+def media_kind(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext in ALLOWED_IMAGE_EXT: return 'image'
+    if ext in VIDEO_EXT: return 'video'
+    return 'other'
+
+def catalog_folder(folder_name):
+    """
+    Re-list one media folder into media_files and refresh has_pictures/has_videos
+    for the profiles pointing at it. Call after anything that touches the folder.
+    """
+    if not folder_name: return
+    cur = get_conn().cursor()
+    folder = os.path.join(MEDIA_ROOT, folder_name)
+    cur.execute('DELETE FROM media_files WHERE folder=?', (folder_name,))
+    try:
+        st = os.stat(folder)
+        entries = list(os.scandir(folder))
+    except (FileNotFoundError, NotADirectoryError):
+        cur.execute('DELETE FROM media_folders WHERE folder=?', (folder_name,))
+        entries = None
+    if entries is not None:
+        rows = []
+        for e in entries:
+            if not e.is_file(): continue
+            es = e.stat()
+            kind = media_kind(e.name)
+            is_thumb = 1 if kind == 'image' and e.name.lower().startswith('thumbnail') else 0
+            rows.append((folder_name, e.name, kind, es.st_size, es.st_mtime, is_thumb))
+        cur.executemany('INSERT INTO media_files (folder, filename, kind, size, mtime, is_thumbnail) VALUES (?,?,?,?,?,?)', rows)
+        cur.execute('INSERT OR REPLACE INTO media_folders (folder, mtime) VALUES (?, ?)', (folder_name, st.st_mtime))
+    cur.execute("""
+        UPDATE actresses SET
+            has_pictures = EXISTS(SELECT 1 FROM media_files m WHERE m.folder = actresses.folder_name AND m.kind = 'image'),
+            has_videos = EXISTS(SELECT 1 FROM media_files m WHERE m.folder = actresses.folder_name AND m.kind = 'video')
+        WHERE folder_name = ?
+    """, (folder_name,))
+
+def rescan_media(full=False, progress=None):
+    """
+    Incremental catalog refresh: only folders whose directory mtime changed since
+    the last scan are re-listed. Folders gone from disk are dropped.
+    Returns (folders_scanned, folders_removed).
+    """
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute('SELECT folder, mtime FROM media_folders')
+    known = {r['folder']: r['mtime'] for r in cur.fetchall()}
+    recycle = os.path.basename(RECYCLE_BIN)
+    folders = [e for e in os.scandir(MEDIA_ROOT) if e.is_dir() and e.name != recycle]
+    seen = set(); scanned = 0
+    for i, e in enumerate(folders, 1):
+        seen.add(e.name)
+        if full or known.get(e.name) != e.stat().st_mtime:
+            catalog_folder(e.name); scanned += 1
+        if progress: progress(i, len(folders), f'{scanned} folders re-listed')
+    removed = [f for f in known if f not in seen]
+    for f in removed:
+        catalog_folder(f)
+    return scanned, len(removed)
+
+def ensure_folder_listed(folder_name):
+    """
+    Serve a folder's listing from media_files, re-listing it first only if the
+    directory mtime differs from the one recorded by the last catalog_folder
+    (adding, removing or renaming files changes it; rewriting one in place does not).
+    Returns False when the folder does not exist.
+    """
+    try:
+        mtime = os.stat(os.path.join(MEDIA_ROOT, folder_name)).st_mtime
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+    row = get_conn().execute('SELECT mtime FROM media_folders WHERE folder=?', (folder_name,)).fetchone()
+    if row is None or row['mtime'] != mtime:
+        catalog_folder(folder_name)
+    return True
+
 def get_thumbnail_path(folder_name: str):
     if not folder_name: return None
-    folder = os.path.join(MEDIA_ROOT, folder_name)
-    if not os.path.isdir(folder): return None
-    for candidate in os.listdir(folder):
-        low = candidate.lower()
-        if low.startswith('thumbnail') and low.split('.')[-1] in ALLOWED_IMAGE_EXT:
-            return os.path.join(folder, candidate)
-    for candidate in os.listdir(folder):
-        if candidate.rsplit('.',1)[-1].lower() in ALLOWED_IMAGE_EXT:
-            return os.path.join(folder, candidate)
-    return None
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute("SELECT filename FROM media_files WHERE folder=? AND kind='image' ORDER BY is_thumbnail DESC, filename LIMIT 1", (folder_name,))
+    row = cur.fetchone()
+    return os.path.join(MEDIA_ROOT, folder_name, row['filename']) if row else None
 
+def get_thumbnails(folder_names):
+    """Batch form of get_thumbnail_path for a page of rows: {folder: filename}."""
+    folder_names = [f for f in set(folder_names) if f]
+    if not folder_names: return {}
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute(f"""
+        SELECT folder, filename FROM media_files
+        WHERE kind='image' AND folder IN ({','.join('?' * len(folder_names))})
+        ORDER BY folder, is_thumbnail DESC, filename
+    """, folder_names)
+    thumbs = {}
+    for r in cur.fetchall():
+        thumbs.setdefault(r['folder'], r['filename'])
+    return thumbs
+
+def get_missing_thumbnails():
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute("""
+        SELECT a.id, a.name, a.folder_name FROM actresses a
+        WHERE a.folder_name IS NULL OR a.folder_name = ''
+           OR NOT EXISTS (SELECT 1 FROM media_files m WHERE m.kind='image' AND m.folder = a.folder_name)
+        ORDER BY a.id
+    """)
+    missing = [{'id': r['id'], 'name': r['name'], 'folder': r['folder_name']} for r in cur.fetchall()]
+    return missing
 
-def build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, sort_by, age_min=None, age_max=None, height_min=None, height_max=None, page=1, per_page=20):
+# run migration on startup
+ensure_schema()
+
+
+SORT_COLUMNS = ('name', 'age', 'country', 'height_cm', 'weight_kg')
+TEXT_SORT_COLUMNS = ('name', 'country')  # ordered COLLATE NOCASE
+FILTER_KEYS = ('q', 'status_filter', 'ethnicity_filter', 'occupation_filter', 'tag_filter', 'age_min', 'age_max', 'height_min', 'height_max', 'tag_mode', 'weight_min', 'weight_max')
+
+def filters_from_args(args):
+    """Filter kwargs for build_filter_sql/build_count_sql from a request's query string."""
+    return {
+        'q': args.get('q', '').strip(),
+        'status_filter': args.get('status', ''),
+        'ethnicity_filter': args.get('ethnicity', ''),
+        'occupation_filter': args.get('occupation_category', ''),
+        'tag_filter': args.get('tags', ''),
+        'age_min': args.get('age_min', type=int),
+        'age_max': args.get('age_max', type=int),
+        'height_min': args.get('height_min', type=int),
+        'height_max': args.get('height_max', type=int),
+        'tag_mode': 'any' if args.get('tag_mode') == 'any' else 'all',
+        'weight_min': args.get('weight_min', type=float),
+        'weight_max': args.get('weight_max', type=float),
+    }
+
+def fts_query(q):
+    """
+    FTS5 MATCH string for search-box text: each whitespace-separated token quoted
+    as a prefix string, so quotes, '-', ':' or '(' are searched for, not parsed.
+    Empty for blank text.
+    """
+    return ' '.join('"' + tok.replace('"', '""') + '"*' for tok in q.split())
+
+def _filter_where(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, age_min=None, age_max=None, height_min=None, height_max=None, tag_mode='all', weight_min=None, weight_max=None):
+    """FROM clause, WHERE clauses and params shared by the page and count queries."""
     where_clauses = []
     params = []
     
-    # Base SQL: Alias the main table 'actresses' as 'a' in all cases
-    base_sql = 'SELECT a.* FROM actresses a'
+    # Base FROM: Alias the main table 'actresses' as 'a' in all cases
+    from_sql = 'FROM actresses a'
     
     # Full-Text Search (FTS) logic
-    if q:
+    match = fts_query(q) if q else ''
+    if match:
         # Join to FTS table, aliased as 'f', only when searching
-        base_sql = 'SELECT a.* FROM actresses a JOIN actresses_fts f ON a.id = f.rowid'
+        from_sql = 'FROM actresses a JOIN actresses_fts f ON a.id = f.rowid'
         
         # Use the FTS table alias 'f' and the FTS column 'actresses_fts' (or 'f' if the content column is implicitly named) for the MATCH clause
         where_clauses.append('f.actresses_fts MATCH ?') 
-        params.append(q + '*')  # Simple prefix search
+        params.append(match)  # every token as a prefix
         
     # Standard filtering clauses, now all prefixed with 'a.'
     if status_filter:
@@ -278,9 +1062,16 @@ def build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_
         where_clauses.append('a.occupation_category = ?')
         params.append(occupation_filter)
         
-    if tag_filter:
-        where_clauses.append('a.tags LIKE ?')
-        params.append(f'%{tag_filter}%')
+    # Exact tags from the actress_tags index; tag_mode 'all' needs every tag, 'any' at least one
+    filter_tags = parse_tags(tag_filter)
+    if filter_tags:
+        marks = ','.join('?' * len(filter_tags))
+        if tag_mode == 'any' or len(filter_tags) == 1:
+            where_clauses.append(f'a.id IN (SELECT actress_id FROM actress_tags WHERE tag IN ({marks}))')
+            params.extend(filter_tags)
+        else:
+            where_clauses.append(f'a.id IN (SELECT actress_id FROM actress_tags WHERE tag IN ({marks}) GROUP BY actress_id HAVING COUNT(*) = ?)')
+            params.extend(filter_tags + [len(filter_tags)])
         
     if age_min is not None:
         where_clauses.append('a.age IS NOT NULL AND a.age >= ?')
@@ -290,143 +1081,1060 @@ def build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_
         where_clauses.append('a.age IS NOT NULL AND a.age <= ?')
         params.append(age_max)
         
-    # Height parsing (simple assume inches, rough)
+    # Height in cm against the parsed height_cm column; values under 100 are taken as inches
     if height_min is not None:
-        where_clauses.append('a.height IS NOT NULL AND CAST(REPLACE(REPLACE(a.height, "\'", ""), "\"", "") AS INTEGER) >= ?')
-        params.append(height_min)
+        where_clauses.append('a.height_cm >= ?')
+        params.append(height_min if height_min >= 100 else height_min * 2.54)
         
     if height_max is not None:
-        where_clauses.append('a.height IS NOT NULL AND CAST(REPLACE(REPLACE(a.height, "\'", ""), "\"", "") AS INTEGER) <= ?')
-        params.append(height_max)
-        
-    if where_clauses:
-        sql = base_sql + ' WHERE ' + ' AND '.join(where_clauses)
-    else:
-        sql = base_sql
-        
+        where_clauses.append('a.height_cm <= ?')
+        params.append(height_max if height_max >= 100 else height_max * 2.54)
+
+    # Weight in kg against weight_kg
+    if weight_min is not None:
+        where_clauses.append('a.weight_kg >= ?')
+        params.append(weight_min)
+
+    if weight_max is not None:
+        where_clauses.append('a.weight_kg <= ?')
+        params.append(weight_max)
+
+    return from_sql, where_clauses, params
+
+def encode_cursor(sort_by, row):
+    """Opaque keyset cursor for the (sort column, id) position of a row."""
+    raw = json.dumps([sort_by, row[sort_by], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_by):
+    """(value, id) from encode_cursor, or None if the cursor is malformed or for another sort."""
+    try:
+        cur_sort, value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        return None
+    if cur_sort != sort_by or not isinstance(row_id, int):
+        return None
+    return value, row_id
+
+def build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, sort_by, age_min=None, age_max=None, height_min=None, height_max=None, page=1, per_page=20, cursor=None, backwards=False, tag_mode='all', weight_min=None, weight_max=None):
+    """
+    SELECT for one page of filtered actresses ordered by (sort_by, id).
+
+    With a cursor from encode_cursor the page is found by seeking past that row
+    instead of OFFSET, so deep pages cost the same as the first one. backwards=True
+    seeks towards the start; those rows come back in reverse and the caller flips
+    them. per_page=None returns the whole filtered set.
+    """
+    from_sql, where_clauses, params = _filter_where(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, age_min, age_max, height_min, height_max, tag_mode, weight_min, weight_max)
+
     # Ordering
-    if sort_by not in ('name','age','country'):
+    if sort_by not in SORT_COLUMNS:
         sort_by = 'name'
+    col = f'a.{sort_by}'
+    collate = ' COLLATE NOCASE' if sort_by in TEXT_SORT_COLUMNS else ''
+    # NULLs sort first in SQLite, so "after (NULL, id)" also includes every non-NULL value
+    seek = decode_cursor(cursor, sort_by) if cursor else None
+    if seek:
+        value, row_id = seek
+        op = '<' if backwards else '>'
+        if value is None:
+            where_clauses.append(f'({col} IS NULL AND a.id {op} ?)' if backwards else f'(({col} IS NULL AND a.id > ?) OR {col} IS NOT NULL)')
+            params.append(row_id)
+        else:
+            null_side = f' OR {col} IS NULL' if backwards else ''
+            where_clauses.append(f'({col} {op} ?{collate} OR ({col} = ?{collate} AND a.id {op} ?){null_side})')
+            params.extend([value, value, row_id])
+
+    sql = f'SELECT a.* {from_sql}'
+    if where_clauses:
+        sql += ' WHERE ' + ' AND '.join(where_clauses)
         
     # The ORDER BY column must also be prefixed with 'a.' to prevent ambiguity if a search is running
-    sql += f' ORDER BY a.{sort_by} COLLATE NOCASE'
+    direction = 'DESC' if backwards else 'ASC'
+    sql += f' ORDER BY {col}{collate} {direction}, a.id {direction}'
     
     # Pagination (Feature 3)
-    offset = (page - 1) * per_page
-    sql += f' LIMIT ? OFFSET ?'
-    params.extend([per_page, offset])
+    if per_page is not None:
+        if seek:
+            sql += ' LIMIT ?'
+            params.append(per_page)
+        else:
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([per_page, (page - 1) * per_page])
     
     return sql, params
 
+def build_count_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, age_min=None, age_max=None, height_min=None, height_max=None, tag_mode='all', weight_min=None, weight_max=None):
+    from_sql, where_clauses, params = _filter_where(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, age_min, age_max, height_min, height_max, tag_mode, weight_min, weight_max)
+    sql = f'SELECT COUNT(*) {from_sql}'
+    if where_clauses:
+        sql += ' WHERE ' + ' AND '.join(where_clauses)
+    return sql, params
+
+# Counts per filter set, valid while data_versions['actresses'] is unchanged
+_count_cache = OrderedDict()
+_count_cache_lock = threading.Lock()
+COUNT_CACHE_SIZE = 256
+
+def data_version(name='actresses'):
+    row = get_conn().execute('SELECT version FROM data_versions WHERE name=?', (name,)).fetchone()
+    return row[0] if row else 0
+
+def count_filtered(filters):
+    sql, params = build_count_sql(**filters)
+    key = (sql, tuple(params))
+    version = data_version()
+    with _count_cache_lock:
+        hit = _count_cache.get(key)
+        if hit and hit[0] == version:
+            _count_cache.move_to_end(key)
+            return hit[1]
+    total = get_conn().execute(sql, params).fetchone()[0]
+    with _count_cache_lock:
+        _count_cache[key] = (version, total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+def fetch_page(filters, sort_by, per_page=20, page=1, after=None, before=None):
+    """
+    One page of filtered rows plus keyset cursors for its neighbours.
+    Returns (rows, next_cursor, prev_cursor); a cursor is None at either end.
+    """
+    if sort_by not in SORT_COLUMNS:
+        sort_by = 'name'
+    cursor = before or after
+    backwards = bool(before)
+    sql, params = build_filter_sql(sort_by=sort_by, page=page, per_page=per_page + 1, cursor=cursor, backwards=backwards, **filters)
+    rows = get_conn().execute(sql, params).fetchall()
+    # the page came from OFFSET if the cursor did not decode
+    seeked = cursor is not None and decode_cursor(cursor, sort_by) is not None
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+        has_prev, has_next = has_more, seeked
+    else:
+        has_prev, has_next = (seeked or page > 1), has_more
+    next_cursor = encode_cursor(sort_by, rows[-1]) if rows and has_next else None
+    prev_cursor = encode_cursor(sort_by, rows[0]) if rows and has_prev else None
+    return rows, next_cursor, prev_cursor
+
+# --------------------------
+# Thumbnail derivatives
+# --------------------------
+# Small renditions of media images live in THUMB_CACHE_DIR, keyed by source path,
+# source mtime, size and format, so a replaced original never serves a stale thumb.
+_thumb_cache_bytes = None  # running total, computed on first write
+
+def thumb_size_for(w):
+    for size in THUMB_SIZES:
+        if w <= size: return size
+    return THUMB_SIZES[-1]
+
+def thumb_cache_path(src_path, size, fmt):
+    st = os.stat(src_path)
+    key = hashlib.sha1(f'{src_path}|{st.st_mtime_ns}|{size}|{fmt}'.encode('utf-8')).hexdigest()
+    return os.path.join(THUMB_CACHE_DIR, key[:2], f'{key}.{"webp" if fmt == "webp" else "jpg"}')
+
+def render_thumbnail(src_path, dest_path, size, fmt='jpeg'):
+    """Write a rendition whose shorter edge is `size` px (never upscaled). Returns bytes written."""
+    from PIL import Image as PILImage, ImageOps
+    with PILImage.open(src_path) as img:
+        img.draft('RGB', (size, size))  # lets JPEG decode at reduced scale
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        scale = size / min(img.size)
+        if scale < 1:
+            img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), PILImage.LANCZOS)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        tmp_path = f'{dest_path}.{os.getpid()}.tmp'
+        if fmt == 'webp':
+            img.save(tmp_path, 'WEBP', quality=80, method=4)
+        else:
+            img.save(tmp_path, 'JPEG', quality=82, optimize=True, progressive=True)
+    os.replace(tmp_path, dest_path)
+    return os.path.getsize(dest_path)
+
+def evict_cache_dir(directory, max_bytes):
+    """Delete least recently used (oldest mtime) files until directory is under 90% of max_bytes; returns its size."""
+    entries = []
+    for root, dirs, files in os.walk(directory):
+        for f in files:
+            try:
+                st = os.stat(os.path.join(root, f))
+                entries.append((st.st_mtime, st.st_size, os.path.join(root, f)))
+            except FileNotFoundError:
+                continue
+    total = sum(e[1] for e in entries)
+    if total > max_bytes:
+        # evict down to 90% so we are not pruning on every write
+        for mtime, size, path in sorted(entries):
+            try: os.remove(path)
+            except FileNotFoundError: pass
+            total -= size
+            if total <= max_bytes * 0.9: break
+    return total
+
+def prune_thumb_cache(added_bytes=0):
+    """Keep THUMB_CACHE_DIR under THUMB_CACHE_MAX_BYTES, evicting least recently served first."""
+    global _thumb_cache_bytes
+    if _thumb_cache_bytes is not None:
+        _thumb_cache_bytes += added_bytes
+        if _thumb_cache_bytes <= THUMB_CACHE_MAX_BYTES: return
+    _thumb_cache_bytes = evict_cache_dir(THUMB_CACHE_DIR, THUMB_CACHE_MAX_BYTES)
+
+def _pregen_thumb(src_path, size, fmt):
+    dest = thumb_cache_path(src_path, size, fmt)
+    if os.path.exists(dest): return 0
+    return render_thumbnail(src_path, dest, size, fmt)
+
+# --------------------------
+# Duplicate detection (merge candidates)
+# --------------------------
+# Pairs are shortlisted by shared name trigrams (Dice >= NAME_DICE_MIN) using a
+# prefix filter, so a pass touches each name's rarest grams rather than every
+# pair; only the shortlist is scored with fuzz.ratio. Inserts and renames are
+# queued in merge_dirty by triggers and rescored against their own trigram block.
+MERGE_SCORE_MIN = 80         # fuzz.ratio must exceed this to list a pair
+NAME_DICE_MIN = 0.4          # trigram overlap needed to score a pair at all
+MERGE_POOL_MIN_PAIRS = 5000  # smaller shortlists are scored inline, no process pool
+MERGE_POOL_CHUNK = 2000
+MERGE_PER_PAGE = 50
+
+def _dice_ok(a, b):
+    return 2 * len(a & b) >= NAME_DICE_MIN * (len(a) + len(b))
+
+def _min_shared(grams):
+    # fewest grams a set of this size can share with any partner and still reach NAME_DICE_MIN
+    return math.ceil(NAME_DICE_MIN * len(grams) / (2 - NAME_DICE_MIN))
+
+def shortlist_name_pairs(grams):
+    """
+    {(id1, id2)} with id1 < id2 whose trigram sets reach NAME_DICE_MIN, from
+    grams = {id: trigram set}. Grams are ordered rarest first; two sets that reach
+    the threshold always share a gram within their prefixes, so only prefix
+    grams are indexed and probed.
+    """
+    df = Counter(g for gs in grams.values() for g in gs)
+    index = defaultdict(list)
+    pairs = set()
+    for i, gs in grams.items():
+        ordered = sorted(gs, key=lambda g: (df[g], g))
+        prefix = ordered[:len(ordered) - _min_shared(gs) + 1]
+        seen = set()
+        for g in prefix:
+            for j in index[g]:
+                if j not in seen:
+                    seen.add(j)
+                    if _dice_ok(gs, grams[j]):
+                        pairs.add((min(i, j), max(i, j)))
+            index[g].append(i)
+    return pairs
+
+def score_name_pairs(pairs, workers=None, progress=None):
+    """[(id1, id2, score)] for pairs of (id1, name1, id2, name2) scoring above MERGE_SCORE_MIN."""
+    from name_matching import score_pairs
+    if len(pairs) < MERGE_POOL_MIN_PAIRS or workers == 1:
+        return score_pairs(pairs, MERGE_SCORE_MIN)
+    scored = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(score_pairs, pairs[i:i + MERGE_POOL_CHUNK], MERGE_SCORE_MIN)
+                   for i in range(0, len(pairs), MERGE_POOL_CHUNK)]
+        try:
+            for done, fut in enumerate(as_completed(futures), 1):
+                scored.extend(fut.result())
+                if progress: progress(min(done * MERGE_POOL_CHUNK, len(pairs)), len(pairs), 'Scoring name pairs')
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return scored
+
+def refresh_merge_candidates(full=False, workers=None, progress=None):
+    """
+    Rescore the actresses queued in merge_dirty against their trigram block.
+    Falls back to one full pass when full=True or when a large share of the
+    table is queued (first run, big imports). Returns the number of actresses rescored.
+    progress(done, total, message) is called as pairs are scored (see submit_job).
+    """
+    cur = get_conn().cursor()
+    dirty = [r[0] for r in cur.execute('SELECT actress_id FROM merge_dirty')]
+    if not dirty and not full:
+        return 0
+    total = cur.execute('SELECT COUNT(*) FROM actresses').fetchone()[0]
+    full = full or len(dirty) * 4 >= total
+
+    if full:
+        rows = cur.execute('SELECT id, name FROM actresses').fetchall()
+        names = {r['id']: normalize_name(r['name']) for r in rows}
+        grams = {i: name_trigrams(n) for i, n in names.items()}
+        cur.execute('DELETE FROM name_trigrams')
+        cur.execute('DELETE FROM merge_candidates')
+        cur.executemany('INSERT INTO name_trigrams (trigram, actress_id) VALUES (?, ?)',
+                        ((g, i) for i, gs in grams.items() for g in gs))
+        pairs = shortlist_name_pairs(grams)
+        rescored = len(rows)
+    else:
+        # ids go in as one JSON array, however many an import queued
+        dirty_ids = json.dumps(dirty)
+        rows = cur.execute('SELECT a.id, a.name FROM json_each(?) d JOIN actresses a ON a.id = d.value',
+                           (dirty_ids,)).fetchall()
+        names = {r['id']: normalize_name(r['name']) for r in rows}
+        grams = {i: name_trigrams(n) for i, n in names.items()}
+        cur.execute('DELETE FROM name_trigrams WHERE actress_id IN (SELECT value FROM json_each(?))', (dirty_ids,))
+        cur.execute('''DELETE FROM merge_candidates WHERE id1 IN (SELECT value FROM json_each(?1))
+                                                        OR id2 IN (SELECT value FROM json_each(?1))''', (dirty_ids,))
+        cur.executemany('INSERT INTO name_trigrams (trigram, actress_id) VALUES (?, ?)',
+                        ((g, i) for i, gs in grams.items() for g in gs))
+        block = {}
+        for i, gs in grams.items():
+            gmarks = ','.join('?' * len(gs))
+            cur.execute(f'''SELECT actress_id FROM name_trigrams WHERE trigram IN ({gmarks}) AND actress_id != ?
+                            GROUP BY actress_id HAVING COUNT(*) >= ?''', [*gs, i, max(_min_shared(gs), 1)])
+            block[i] = [r[0] for r in cur.fetchall()]
+        others = {j for js in block.values() for j in js} - names.keys()
+        if others:
+            for r in cur.execute('SELECT a.id, a.name FROM json_each(?) o JOIN actresses a ON a.id = o.value',
+                                 (json.dumps(sorted(others)),)).fetchall():
+                names[r['id']] = normalize_name(r['name'])
+                grams[r['id']] = name_trigrams(names[r['id']])
+        pairs = {(min(i, j), max(i, j)) for i, js in block.items() for j in js if _dice_ok(grams[i], grams[j])}
+        rescored = len(rows)
+
+    if progress: progress(0, len(pairs), 'Scoring name pairs')
+    scored = score_name_pairs([(a, names[a], b, names[b]) for a, b in pairs], workers, progress)
+    cur.executemany('INSERT OR REPLACE INTO merge_candidates (id1, id2, score) VALUES (?, ?, ?)', scored)
+    cur.executemany('DELETE FROM merge_dirty WHERE actress_id=?', [(i,) for i in dirty])
+    return rescored
+
 # Tag cloud (Feature 1)
 def get_tag_cloud():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute('SELECT tags FROM actresses WHERE tags IS NOT NULL AND tags != ""')
-    rows = cur.fetchall()
-    tags_text = ' '.join([r['tags'] for r in rows])
-    words = [w.strip('#, .') for w in tags_text.split() if w.startswith('#') and len(w) > 1]
-    common = Counter(words).most_common(20)
-    conn.close()
-    return common
-
-# Social Media Sync Utilities
-def sync_twitter(username):
-    if not TWITTER_BEARER:
-        return {'error': 'Twitter bearer token not set'}
-    headers = {'Authorization': f'Bearer {TWITTER_BEARER}'}
-    url = f'https://api.twitter.com/2/users/by/username/{username}?user.fields=public_metrics,description'
-    resp = requests.get(url, headers=headers)
-    if resp.status_code == 200:
-        data = resp.json()['data']
-        return {
-            'followers_count': data.get('public_metrics', {}).get('followers_count', 0),
-            'description': data.get('description', ''),
-            'verified': data.get('verified', False)
-        }
-    return {'error': resp.text}
-
-def sync_instagram(username):
-    url = f'https://www.instagram.com/{username}/'
-    resp = requests.get(url)
-    if resp.status_code == 200:
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        script = soup.find('script', text=lambda t: 'window._sharedData' in t)
-        if script:
-            # Note: Instagram structure may change; this is a basic scrape
-            data = json.loads(script.string.split('window._sharedData = ')[1].rstrip(';'))
-            user = data['entry_data']['ProfilePage'][0]['graphql']['user']
-            return {
-                'followers_count': user['edge_followed_by']['count'],
-                'biography': user['biography'],
-                'is_verified': user['is_verified']
-            }
-    return {'error': 'Failed to fetch'}
+    cur = get_conn().cursor()
+    cur.execute('SELECT tag, count FROM tag_counts ORDER BY count DESC, tag LIMIT 20')
+    return [(r['tag'], r['count']) for r in cur.fetchall()]
 
-# Backup Utility
-def backup_database(automated=False):
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_name = f'backup_{timestamp}.zip'
-    backup_path = os.path.join(BACKUP_DIR, backup_name)
-    with zipfile.ZipFile(backup_path, 'w') as zf:
-        # Backup DB
+# --------------------------
+# PDF cache
+# --------------------------
+# Rendered profile PDFs live in PDF_CACHE_DIR under a hash of the row, the
+# thumbnail path and its mtime, so any edit or new thumbnail renders afresh and
+# an unchanged profile is served straight from disk.
+PDF_RENDER_VERSION = 1  # bump when profile_pdf's layout changes
+PDF_CATALOG_BATCH = 64  # rows fetched and queued for rendering at a time
+_pdf_cache_bytes = None
+
+def pdf_cache_path(actress, thumb_path):
+    thumb_mtime = os.stat(thumb_path).st_mtime_ns if thumb_path and os.path.exists(thumb_path) else None
+    payload = json.dumps([PDF_RENDER_VERSION, actress, thumb_path, thumb_mtime], sort_keys=True, default=str)
+    key = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return os.path.join(PDF_CACHE_DIR, key[:2], f'{key}.pdf')
+
+def prune_pdf_cache(added_bytes=0):
+    global _pdf_cache_bytes
+    if _pdf_cache_bytes is not None:
+        _pdf_cache_bytes += added_bytes
+        if _pdf_cache_bytes <= PDF_CACHE_MAX_BYTES: return
+    _pdf_cache_bytes = evict_cache_dir(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+
+def cached_profile_pdf(actress):
+    """Path of the rendered PDF for an actress row (dict), rendering it on a cache miss."""
+    thumb_path = get_thumbnail_path(actress['folder_name']) if actress['folder_name'] else None
+    path = pdf_cache_path(actress, thumb_path)
+    if os.path.exists(path):
+        os.utime(path)  # mark as recently used for eviction
+    else:
+        from pdf_export import render_profile_pdf
+        prune_pdf_cache(render_profile_pdf(actress, thumb_path, path))
+    return path
+
+def iter_catalog_pdfs(sql, params, workers=PDF_WORKERS):
+    """
+    Yield (actress, pdf_path) for every row of sql in order. Cache misses are
+    rendered on a process pool; the next PDF_CATALOG_BATCH rows are fetched and
+    queued while the current batch is still rendering or being streamed.
+    """
+    from pdf_export import render_profile_pdf
+    written = 0
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = []
+        for rows in itertools.chain(iter_rows(sql, params, PDF_CATALOG_BATCH), [[]]):
+            thumbs = get_thumbnails([r['folder_name'] for r in rows])
+            batch = []
+            for r in rows:
+                actress = dict(r)
+                folder = actress['folder_name']
+                thumb_path = os.path.join(MEDIA_ROOT, folder, thumbs[folder]) if folder in thumbs else None
+                path = pdf_cache_path(actress, thumb_path)
+                fut = None if os.path.exists(path) else pool.submit(render_profile_pdf, actress, thumb_path, path)
+                batch.append((actress, path, fut))
+            for actress, path, fut in pending:
+                if fut: written += fut.result()
+                else: os.utime(path)
+                yield actress, path
+            pending = batch
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)  # also on client disconnect
+        prune_pdf_cache(written)
+
+# --------------------------
+# Wikipedia summary cache
+# --------------------------
+# /scrape/<name> answers from a per-process LRU, then from a SQLite cache file
+# shared by all workers, and only then asks Wikipedia. "No article" answers are
+# cached too, for a shorter time; network/server errors are not cached.
+SCRAPE_CACHE_PATH = os.getenv('SCRAPE_CACHE_PATH', os.path.splitext(DB_PATH)[0] + '_scrape_cache.db')
+SCRAPE_TTL = float(os.getenv('SCRAPE_TTL_HOURS', '168')) * 3600
+SCRAPE_NEGATIVE_TTL = float(os.getenv('SCRAPE_NEGATIVE_TTL_HOURS', '24')) * 3600
+SCRAPE_MEMORY_SIZE = 4096
+SCRAPE_BATCH_MAX = 1000
+SCRAPE_BATCH_WORKERS = int(os.getenv('SCRAPE_BATCH_WORKERS', '8'))
+_scrape_memory = OrderedDict()  # key -> (expires_at, extract or None)
+_scrape_memory_lock = threading.Lock()
+
+def _scrape_conn():
+    conn = getattr(_local, 'scrape_conn', None)
+    if conn is None or _local.scrape_pid != os.getpid():
+        conn = sqlite3.connect(SCRAPE_CACHE_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS summaries (
+            key TEXT PRIMARY KEY,
+            extract TEXT,                    -- NULL: Wikipedia has no article
+            fetched_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID''')
+        _local.scrape_conn, _local.scrape_pid = conn, os.getpid()
+    return conn
+
+def scrape_cache_key(name):
+    return ' '.join(name.split())
+
+def _scrape_remember(key, extract, expires_at):
+    with _scrape_memory_lock:
+        _scrape_memory[key] = (expires_at, extract)
+        _scrape_memory.move_to_end(key)
+        while len(_scrape_memory) > SCRAPE_MEMORY_SIZE:
+            _scrape_memory.popitem(last=False)
+
+def cached_summary(key):
+    """(hit, extract) from memory, then the cache file; a hit with extract None is a cached "no article"."""
+    now = time.time()
+    with _scrape_memory_lock:
+        hit = _scrape_memory.get(key)
+        if hit and hit[0] > now:
+            _scrape_memory.move_to_end(key)
+            return True, hit[1]
+    row = _scrape_conn().execute('SELECT extract, expires_at FROM summaries WHERE key=?', (key,)).fetchone()
+    if row and row['expires_at'] > now:
+        _scrape_remember(key, row['extract'], row['expires_at'])
+        return True, row['extract']
+    return False, None
+
+def store_summaries(results):
+    """Cache [(key, extract or None)] in both tiers."""
+    now = time.time()
+    rows = [(key, extract, now, now + (SCRAPE_TTL if extract else SCRAPE_NEGATIVE_TTL)) for key, extract in results]
+    db = _scrape_conn()
+    db.execute('BEGIN')
+    try:
+        db.execute('DELETE FROM summaries WHERE expires_at < ?', (now,))
+        db.executemany('INSERT OR REPLACE INTO summaries (key, extract, fetched_at, expires_at) VALUES (?, ?, ?, ?)', rows)
+        db.execute('COMMIT')
+    except BaseException:
+        db.execute('ROLLBACK'); raise
+    for key, extract, _, expires_at in rows:
+        _scrape_remember(key, extract, expires_at)
+
+def wikipedia_summary_cached(name):
+    """(extract or None, served_from_cache) for one name."""
+    key = scrape_cache_key(name)
+    hit, extract = cached_summary(key)
+    if hit:
+        return extract, True
+    from social_sync import wikipedia_lookup
+    extract = wikipedia_lookup(key)
+    store_summaries([(key, extract)])
+    return extract, False
+
+def prefetch_summaries(names, workers=SCRAPE_BATCH_WORKERS, progress=None):
+    """
+    Fill the cache for many names at once: cache hits are answered locally, the
+    rest are fetched on a thread pool sharing one keep-alive session and the
+    per-host rate limiter. Returns ({key: extract or None}, stats); names whose
+    lookup failed are listed in stats['errors'] and left out of the results.
+    """
+    from social_sync import wikipedia_lookup, make_session, HostRateLimiter
+    results, misses = {}, []
+    for key in dict.fromkeys(scrape_cache_key(n) for n in names if n and n.strip()):
+        hit, extract = cached_summary(key)
+        if hit: results[key] = extract
+        else: misses.append(key)
+    hits = len(results)
+    fetched, errors = [], {}
+    started = time.perf_counter()
+    session, limiter = make_session(workers), HostRateLimiter()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape')
+    try:
+        futures = {pool.submit(wikipedia_lookup, key, session, limiter): key for key in misses}
+        for done, fut in enumerate(as_completed(futures), 1):
+            key = futures[fut]
+            try:
+                fetched.append((key, fut.result()))
+            except Exception as e:
+                errors[key] = f'{type(e).__name__}: {e}'
+            if progress: progress(done, len(futures), 'Fetching summaries')
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        session.close()
+        if fetched: store_summaries(fetched)  # keep what arrived, even if cancelled
+    results.update(fetched)
+    elapsed = time.perf_counter() - started
+    return results, {'hits': hits, 'fetched': len(fetched), 'errors': errors, 'seconds': round(elapsed, 3)}
+
+# --------------------------
+# Background jobs
+# --------------------------
+# Backup, restore, imports, merge refresh, media rescan and the age update can
+# run on a small thread pool instead of inside the request: the route answers
+# 202 with a job id and /jobs/<id> reports status, progress and the result.
+# Job rows live in their own SQLite file, so progress writes never wait on the
+# data write lock (an import holds it for its whole transaction), any worker
+# process can answer /jobs/<id>, and a restore that replaces DB_PATH keeps its
+# own record. CPU-bound steps inside a job still fan out to process pools.
+JOBS_DB_PATH = os.getenv('JOBS_DB_PATH', os.path.splitext(DB_PATH)[0] + '_jobs.db')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))  # SQLite has one writer; more only helps read-heavy jobs
+JOB_PROGRESS_INTERVAL = 0.5  # seconds between persisted progress updates
+JOB_RETENTION_DAYS = 7
+JOB_FINAL_STATES = ('done', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    pass
+
+def _jobs_conn():
+    conn = getattr(_local, 'jobs_conn', None)
+    if conn is None or _local.jobs_pid != os.getpid():
+        conn = sqlite3.connect(JOBS_DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,            -- queued, running, done, failed, cancelled
+            done INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            unit TEXT NOT NULL DEFAULT 'items',
+            message TEXT,
+            result TEXT,                     -- JSON
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            pid INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            updated_at REAL NOT NULL
+        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)')
+        _local.jobs_conn, _local.jobs_pid = conn, os.getpid()
+    return conn
+
+class Job:
+    """
+    Progress callback handed to a job function: job(done, total=None, message=None).
+    Progress is written to the jobs table at most every JOB_PROGRESS_INTERVAL;
+    once a cancel is requested the next call raises JobCancelled.
+    """
+    def __init__(self, job_id):
+        self.id = job_id
+        self.done, self.total, self.message = 0, None, None
+        self.cancel_event = threading.Event()
+        self._saved = 0.0
+
+    def __call__(self, done, total=None, message=None):
+        self.done = done
+        if total is not None: self.total = total
+        if message is not None: self.message = message
+        now = time.monotonic()
+        if now - self._saved >= JOB_PROGRESS_INTERVAL:
+            self._saved = now
+            rows = _jobs_conn().execute(
+                'UPDATE jobs SET done=?, total=?, message=?, updated_at=? WHERE id=? RETURNING cancel_requested',
+                (self.done, self.total, self.message, time.time(), self.id)).fetchall()
+            if rows and rows[0][0]:
+                self.cancel_event.set()  # requested from another worker process
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+_jobs_lock = threading.Lock()
+_job_pool = None
+_job_pool_pid = None
+_active_jobs = {}  # job id -> Job, queued or running in this process
+
+def _run_job(job, fn):
+    db = _jobs_conn()
+    if db.execute("UPDATE jobs SET status='running', started_at=?, updated_at=? WHERE id=? AND status='queued'",
+                  (time.time(), time.time(), job.id)).rowcount == 0:
+        _active_jobs.pop(job.id, None)  # cancelled while queued
+        return
+    status, result, error = 'done', None, None
+    try:
+        reopen_if_db_replaced()
+        result = fn(job)
         conn = get_conn()
-        with zf.open('actresses.sql', 'w') as f:
-            for line in conn.iterdump():
-                f.write((f"{line}\n").encode('utf-8'))
+        if conn.in_transaction: conn.commit()
+    except JobCancelled:
+        get_conn().rollback()
+        status = 'cancelled'
+    except Exception as e:
+        get_conn().rollback()
+        app.logger.exception('Job %s failed', job.id)
+        status, error = 'failed', f'{type(e).__name__}: {e}'
+    now = time.time()
+    db.execute('UPDATE jobs SET status=?, done=?, total=?, message=?, result=?, error=?, finished_at=?, updated_at=? WHERE id=?',
+               (status, job.done, job.total, job.message, json.dumps(result, default=str), error, now, now, job.id))
+    _active_jobs.pop(job.id, None)
+
+def submit_job(kind, fn, unit='items'):
+    """
+    Queue fn(progress) on the job pool and return the job id at once. fn runs on
+    a pool thread with its own get_conn(); its transaction is committed when it
+    returns and rolled back if it raises or is cancelled. Its return value must
+    be JSON-serialisable and becomes the job's result.
+    """
+    global _job_pool, _job_pool_pid
+    job = Job(uuid.uuid4().hex)
+    now = time.time()
+    db = _jobs_conn()
+    db.execute('DELETE FROM jobs WHERE finished_at < ?', (now - JOB_RETENTION_DAYS * 86400,))
+    db.execute("INSERT INTO jobs (id, kind, status, unit, pid, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+               (job.id, kind, unit, os.getpid(), now, now))
+    with _jobs_lock:
+        if _job_pool is None or _job_pool_pid != os.getpid():
+            _job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+            _job_pool_pid = os.getpid()
+        _active_jobs[job.id] = job
+        _job_pool.submit(_run_job, job, fn)
+    return job.id
+
+def _job_orphaned(row):
+    # queued/running job whose worker process is gone (restart, crash)
+    if row['pid'] == os.getpid():
+        return row['id'] not in _active_jobs
+    if os.name == 'nt':
+        return False  # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(row['pid'], 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+def _job_status(row):
+    job = dict(row)
+    end = row['finished_at'] or time.time()
+    elapsed = end - row['started_at'] if row['started_at'] else 0
+    job['elapsed'] = round(elapsed, 3)
+    job['rate'] = round(row['done'] / elapsed, 1) if elapsed > 0 else None  # units per second
+    job['percent'] = round(100 * row['done'] / row['total'], 1) if row['total'] else None
+    job['result'] = json.loads(row['result']) if row['result'] else None
+    job['cancel_requested'] = bool(row['cancel_requested'])
+    return job
+
+def get_job(job_id):
+    """Status dict for /jobs/<id>, or None for an unknown (or expired) job."""
+    db = _jobs_conn()
+    row = db.execute('SELECT * FROM jobs WHERE id=?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    if row['status'] not in JOB_FINAL_STATES and _job_orphaned(row):
+        db.execute("UPDATE jobs SET status='failed', error=?, finished_at=?, updated_at=? WHERE id=? AND status=?",
+                   ('Interrupted: the worker running this job exited', time.time(), time.time(), job_id, row['status']))
+        row = db.execute('SELECT * FROM jobs WHERE id=?', (job_id,)).fetchone()
+    return _job_status(row)
+
+def cancel_job(job_id):
+    """Cancel a queued job outright; ask a running one to stop at its next progress call."""
+    db = _jobs_conn()
+    db.execute("UPDATE jobs SET status='cancelled', finished_at=?, updated_at=? WHERE id=? AND status='queued'",
+               (time.time(), time.time(), job_id))
+    db.execute("UPDATE jobs SET cancel_requested=1 WHERE id=? AND status='running'", (job_id,))
+    job = _active_jobs.get(job_id)
+    if job is not None:
+        job.cancel_event.set()
+    return get_job(job_id)
+
+def wants_job():
+    """True when the caller asked to run the route as a background job (?async=1 or Prefer: respond-async)."""
+    return (request.values.get('async') == '1'
+            or 'respond-async' in request.headers.get('Prefer', ''))
+
+def job_response(job_id):
+    status_url = url_for('job_status', job_id=job_id)
+    return jsonify({'job_id': job_id, 'status_url': status_url}), 202, {'Location': status_url}
+
+# Backup Utility
+# A backup is backups/backup_<timestamp>.zip holding actresses.db, a snapshot
+# taken with the SQLite online backup API, and manifest.json, which maps each
+# file under MEDIA_ROOT to the SHA-256 of its contents. Media bytes are kept once
+# in the content-addressed store backups/store/<2 hex>/<sha256>[.gz], so a backup only
+# copies files that are new or changed; files whose size and mtime match the
+# previous manifest are not even re-read. prune_backups keeps the newest
+# BACKUP_KEEP archives and drops store blobs no remaining manifest references.
+# Backups and pruning hold backup_lock(), which also locks a file in BACKUP_DIR,
+# since the scheduler and /backup can fire in every worker process.
+BACKUP_FORMAT = 2
+BACKUP_SNAPSHOT_PAGES = 4096      # pages per online-backup step (progress granularity)
+BACKUP_READ_CHUNK = 1024 * 1024
+BACKUP_COUNTED_TABLES = ('actresses', 'actress_tags', 'media_files')
+BACKUP_WORKERS = int(os.getenv('BACKUP_WORKERS', str(min(8, os.cpu_count() or 1))))
+BACKUP_IN_FLIGHT = 64             # files queued on the pool ahead of the walk
+BACKUP_GZIP_LEVEL = 6
+BACKUP_MIN_SAVING = 0.1           # a gzipped blob must be this much smaller than the file, else it is stored raw
+PRECOMPRESSED_EXT = ALLOWED_IMAGE_EXT | VIDEO_EXT | {'webp', 'heic', 'avif', 'mp3', 'm4a', 'aac', 'ogg', 'zip', 'gz', '7z', 'rar'}
+BACKUP_LOCK_PATH = os.path.join(BACKUP_DIR, '.lock')
+BACKUP_MARKER_STALE = 24 * 3600   # .running-* markers older than this were left by a crashed backup
+_backup_lock = threading.Lock()
+
+@contextmanager
+def backup_lock():
+    """One backup/prune at a time across threads and worker processes."""
+    with _backup_lock, open(BACKUP_LOCK_PATH, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1); break
+                except OSError:
+                    pass  # LK_LOCK gives up after ~10 s; a long backup may hold it for minutes
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(f, fcntl.LOCK_UN)
+            else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _oldest_running_backup():
+    """
+    Start time of the oldest backup still writing (per its .running-* marker), or
+    None. Pruning keeps blobs touched since then, in case a backup runs without
+    the lock (e.g. a BACKUP_DIR shared between hosts, where flock is advisory only).
+    """
+    oldest = None
+    for name in os.listdir(BACKUP_DIR):
+        if not name.startswith('.running-'): continue
+        path = os.path.join(BACKUP_DIR, name)
+        try:
+            mtime = os.path.getmtime(path)
+            if time.time() - mtime > BACKUP_MARKER_STALE:
+                os.remove(path); continue
+        except FileNotFoundError:
+            continue
+        oldest = mtime if oldest is None else min(oldest, mtime)
+    return oldest
+
+def backup_names():
+    """backup_*.zip file names in BACKUP_DIR, oldest first."""
+    return sorted(f for f in os.listdir(BACKUP_DIR) if f.startswith('backup_') and f.endswith('.zip'))
+
+def read_backup_manifest(src):
+    """manifest.json of a backup zip (path or file object); None for legacy SQL-dump backups."""
+    with zipfile.ZipFile(src) as zf:
+        try:
+            return json.loads(zf.read('manifest.json'))
+        except KeyError:
+            return None
+
+def store_blob_path(digest, compressed=False):
+    return os.path.join(BACKUP_STORE_DIR, digest[:2], digest + ('.gz' if compressed else ''))
+
+def find_store_blob(digest):
+    """Path of the stored blob for digest (raw or gzipped), or None."""
+    for compressed in (False, True):
+        path = store_blob_path(digest, compressed)
+        if os.path.exists(path): return path
+    return None
+
+def touch_store_blob(digest):
+    """find_store_blob, marking the blob as just used so a prune racing this backup keeps it."""
+    path = find_store_blob(digest)
+    if path: os.utime(path)
+    return path
+
+def open_store_blob(digest):
+    """Readable binary file object with the original bytes of a stored blob."""
+    path = find_store_blob(digest)
+    if path is None:
+        raise FileNotFoundError(f'Media blob {digest} is not in {BACKUP_STORE_DIR}')
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+def snapshot_database(dest_path, progress=None):
+    """
+    Copy DB_PATH to dest_path with Connection.backup. The source connection holds
+    one read transaction for the whole copy, so the snapshot is consistent and,
+    under WAL, writers carry on meanwhile instead of restarting the backup.
+    """
+    src = _open_conn()
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.isolation_level = None
+        src.execute('BEGIN')
+        src.execute('SELECT 1 FROM sqlite_master LIMIT 1')  # pin the read snapshot
+        def step(status, remaining, total):
+            if progress: progress(total - remaining, total, 'Snapshotting database')
+        src.backup(dst, pages=BACKUP_SNAPSHOT_PAGES, progress=step)
+        src.execute('COMMIT')
+    finally:
+        dst.close(); src.close()
+
+def count_backup_rows(db_path):
+    """Row counts of BACKUP_COUNTED_TABLES in a snapshot, recorded so restore can verify them."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return {t: conn.execute(f'SELECT COUNT(*) FROM "{t}"').fetchone()[0] for t in BACKUP_COUNTED_TABLES}
+    finally:
         conn.close()
-        # Backup media if not automated
-        if not automated:
-            for root, dirs, files in os.walk(MEDIA_ROOT):
-                for file in files:
-                    arcname = os.path.join('media', os.path.relpath(os.path.join(root, file), MEDIA_ROOT))
-                    zf.write(os.path.join(root, file), arcname)
-    if not automated:
-        return jsonify({'backup': backup_name})
-    return f'Automated backup created: {backup_name}'
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(BACKUP_READ_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+def media_compressible(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return ext not in PRECOMPRESSED_EXT
+
+def store_media_file(path, digest, compress=False):
+    """
+    Copy path into the store as digest unless that blob is already there; returns
+    bytes written. With compress the blob is gzipped, and kept that way only if
+    it comes out at least BACKUP_MIN_SAVING smaller.
+    """
+    if touch_store_blob(digest):
+        return 0
+    dest = store_blob_path(digest)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f'{dest}.{uuid.uuid4().hex}.tmp'
+    try:
+        if compress:
+            with open(path, 'rb') as src, gzip.open(tmp, 'wb', compresslevel=BACKUP_GZIP_LEVEL) as dst:
+                shutil.copyfileobj(src, dst, BACKUP_READ_CHUNK)
+            if os.path.getsize(tmp) <= os.path.getsize(path) * (1 - BACKUP_MIN_SAVING):
+                dest = store_blob_path(digest, compressed=True)
+            else:
+                shutil.copyfile(path, tmp)
+        else:
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, dest)  # a blob only appears under its digest once complete
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+    return os.path.getsize(dest)
+
+def _snapshot_media_file(path, rel, st, entry):
+    # runs on the backup pool: hashlib and zlib release the GIL, so threads scale with disks and cores
+    if (entry and entry[1] == st.st_size and entry[2] == st.st_mtime_ns
+            and touch_store_blob(entry[0])):
+        return rel, entry, None
+    t0 = time.perf_counter()
+    digest = hash_file(path)
+    t1 = time.perf_counter()
+    written = store_media_file(path, digest, media_compressible(rel))
+    t2 = time.perf_counter()
+    return rel, [digest, st.st_size, st.st_mtime_ns], (t1 - t0, t2 - t1, written)
+
+def _walk_media():
+    for root, dirs, files in os.walk(MEDIA_ROOT):
+        for file in files:
+            path = os.path.join(root, file)
+            yield path, os.path.relpath(path, MEDIA_ROOT).replace(os.sep, '/'), os.stat(path)
+
+def _phase(seconds, amount, unit='bytes'):
+    rate = amount / seconds if seconds > 0 else None
+    if unit == 'bytes':
+        return {'seconds': round(seconds, 3), 'bytes': amount, 'mb_per_sec': round(rate / 1e6, 1) if rate else None}
+    return {'seconds': round(seconds, 3), unit: amount, f'{unit}_per_sec': round(rate, 1) if rate else None}
+
+def snapshot_media(previous=None, progress=None, workers=None):
+    """
+    Put every file under MEDIA_ROOT into the store and return (media, stats) where
+    media maps 'folder/file' -> [sha256, size, mtime_ns]. Entries of the previous
+    manifest are reused for files whose size and mtime_ns are unchanged.
+
+    The directory walk runs here while up to BACKUP_IN_FLIGHT files are hashed and
+    stored on a pool of BACKUP_WORKERS threads. stats['phases'] reports each
+    phase's time (summed over workers for hash/store) and throughput.
+    """
+    previous = previous or {}
+    workers = workers or BACKUP_WORKERS
+    media = {}
+    found = 0
+    walk_s = hash_s = store_s = 0.0
+    hashed = hashed_bytes = stored = stored_bytes = written_bytes = 0
+    walk = _walk_media()
+    in_flight = set()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backup') as pool:
+        try:
+            while True:
+                t = time.perf_counter()
+                while len(in_flight) < BACKUP_IN_FLIGHT and (item := next(walk, None)) is not None:
+                    path, rel, st = item
+                    found += 1
+                    in_flight.add(pool.submit(_snapshot_media_file, path, rel, st, previous.get(rel)))
+                walk_s += time.perf_counter() - t
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    rel, entry, timing = fut.result()
+                    media[rel] = entry
+                    if timing:
+                        hash_s += timing[0]; store_s += timing[1]
+                        hashed += 1; hashed_bytes += entry[1]
+                        if timing[2]:
+                            stored += 1; stored_bytes += entry[1]; written_bytes += timing[2]
+                if progress: progress(len(media), found, 'Storing media')
+        except BaseException:
+            for fut in in_flight: fut.cancel()
+            raise
+    stats = {
+        'files': len(media), 'hashed': hashed, 'stored': stored, 'stored_bytes': written_bytes, 'workers': workers,
+        'phases': {
+            'walk': _phase(walk_s, len(media), 'files'),
+            'hash': _phase(hash_s, hashed_bytes),
+            'store': dict(_phase(store_s, stored_bytes), written=written_bytes),
+        },
+    }
+    return media, stats
+
+def latest_manifest():
+    for name in reversed(backup_names()):
+        try:
+            manifest = read_backup_manifest(os.path.join(BACKUP_DIR, name))
+        except zipfile.BadZipFile:
+            continue
+        if manifest: return manifest
+    return None
+
+def backup_database(automated=False, progress=None):
+    """
+    Write backups/backup_<timestamp>.zip (DB snapshot + media manifest), store new
+    or changed media files and prune old backups. Returns the archive name.
+    """
+    with backup_lock():
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')  # microseconds: unique even for same-second runs
+        backup_name = f'backup_{timestamp}.zip'
+        backup_path = os.path.join(BACKUP_DIR, backup_name)
+        marker = os.path.join(BACKUP_DIR, f'.running-{timestamp}')
+        open(marker, 'w').close()
+        previous = latest_manifest()
+        started = time.perf_counter()
+        fd, snapshot_path = tempfile.mkstemp(suffix='.db', dir=BACKUP_DIR)
+        os.close(fd)
+        try:
+            snapshot_database(snapshot_path, progress)
+            snapshot_s = time.perf_counter() - started
+            media, stats = snapshot_media(previous and previous.get('media'), progress)
+            stats['phases']['snapshot'] = _phase(snapshot_s, os.path.getsize(snapshot_path))
+            manifest = {
+                'format': BACKUP_FORMAT,
+                'created': timestamp,
+                'automated': automated,
+                'db_bytes': os.path.getsize(snapshot_path),
+                'rows': count_backup_rows(snapshot_path),
+                'media': media,
+                'stats': dict(stats, seconds=round(time.perf_counter() - started, 3)),
+            }
+            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.write(snapshot_path, 'actresses.db')
+                zf.writestr('manifest.json', json.dumps(manifest))
+        except BaseException:
+            if os.path.exists(backup_path):
+                os.remove(backup_path)  # no half-written archives in BACKUP_DIR (failure or cancel)
+            raise
+        finally:
+            os.remove(snapshot_path)
+            os.remove(marker)
+        _prune_backups(BACKUP_KEEP)
+    app.logger.info('Backup %s: %d files, %d stored (%d bytes), %s', backup_name, stats['files'], stats['stored'],
+                    stats['stored_bytes'], ', '.join(f'{k} {v["seconds"]}s' for k, v in stats['phases'].items()))
+    return backup_name
+
+def _prune_backups(keep):
+    names = backup_names()
+    removed = names[:-keep] if keep > 0 else []
+    for name in removed:
+        os.remove(os.path.join(BACKUP_DIR, name))
+    live = set()
+    for name in backup_names():
+        try:
+            manifest = read_backup_manifest(os.path.join(BACKUP_DIR, name))
+        except zipfile.BadZipFile:
+            app.logger.warning('Unreadable backup %s: skipping blob pruning so its media is kept', name)
+            return len(removed), 0, 0
+        if manifest: live.update(entry[0] for entry in manifest['media'].values())
+    running_since = _oldest_running_backup()
+    blobs = freed = 0
+    for root, dirs, files in os.walk(BACKUP_STORE_DIR):
+        for file in files:
+            if file.removesuffix('.gz') not in live and not file.endswith('.tmp'):
+                path = os.path.join(root, file)
+                st = os.stat(path)
+                if running_since is not None and st.st_mtime >= running_since - 1:
+                    continue  # may belong to a backup whose manifest is not written yet
+                freed += st.st_size; os.remove(path); blobs += 1
+    return len(removed), blobs, freed
+
+def prune_backups(keep=None):
+    """Keep the newest keep (default BACKUP_KEEP) backups; returns (backups_removed, blobs_removed, bytes_freed)."""
+    with backup_lock():
+        return _prune_backups(BACKUP_KEEP if keep is None else keep)
 
 # --------------------------
 # Routes
 # --------------------------
 @app.route('/')
 def index():
-    q = request.args.get('q','').strip()
+    filters = filters_from_args(request.args)
+    q = filters['q']
     # Remove view param - always list
     view = 'list'  # Hardcode to list
-    status_filter = request.args.get('status','')
-    ethnicity_filter = request.args.get('ethnicity','')
-    occupation_filter = request.args.get('occupation_category','')
-    tag_filter = request.args.get('tags','')
+    occupation_filter = filters['occupation_filter']
+    tag_filter = filters['tag_filter']
     sort_by = request.args.get('sort','name')
-    age_min = request.args.get('age_min', type=int)
-    age_max = request.args.get('age_max', type=int)
-    height_min = request.args.get('height_min', type=int)
-    height_max = request.args.get('height_max', type=int)
-    page = int(request.args.get('page', 1))
-    sql, params = build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, sort_by, age_min, age_max, height_min, height_max, page)
-    conn = get_conn(); cur = conn.cursor(); cur.execute(sql, params); rows = cur.fetchall()
-    # Total count for pagination
-    count_base = sql.rsplit(' ORDER BY ', 1)[0].rsplit(' LIMIT ? OFFSET ? ', 1)[0]
-    if 'JOIN actresses_fts' in count_base:
-        count_sql = count_base.replace('SELECT a.*', 'SELECT COUNT(*)')
-    else:
-        count_sql = count_base.replace('SELECT *', 'SELECT COUNT(*)')
-    count_params = params[:-2] if len(params) >= 2 else params  # Exclude LIMIT/OFFSET
-    cur.execute(count_sql, count_params); total = cur.fetchone()[0]
-    conn.close()
+    age_min, age_max = filters['age_min'], filters['age_max']
+    height_min, height_max = filters['height_min'], filters['height_max']
+    page = max(1, request.args.get('page', 1, type=int))
+    per_page = 20
+    # Prev/Next links carry keyset cursors; numbered links fall back to OFFSET
+    try:
+        rows, next_cursor, prev_cursor = fetch_page(filters, sort_by, per_page, page,
+            after=request.args.get('after'), before=request.args.get('before'))
+        total = count_filtered(filters)
+    except sqlite3.OperationalError as e:
+        app.logger.warning('List query failed for %s: %s', dict(request.args), e)
+        flash(f'Search could not be run: {e}', 'error')
+        rows, next_cursor, prev_cursor, total = [], None, None, 0
 
     # Pagination info
-    per_page = 20
     total_pages = (total + per_page - 1) // per_page
+    base_qs = urlencode([(k, v) for k, v in request.args.items(multi=True) if k not in ('page', 'after', 'before')])
 
-    missing = []
-    for r in rows:
-        if not r['folder_name'] or not get_thumbnail_path(r['folder_name']):
-            missing.append({'id': r['id'], 'name': r['name'], 'folder': r['folder_name']})
+    thumbs = get_thumbnails([r['folder_name'] for r in rows])
+    missing = [{'id': r['id'], 'name': r['name'], 'folder': r['folder_name']} for r in rows if r['folder_name'] not in thumbs]
 
     tags = get_tag_cloud()  # Feature 1
 
     return render_template('index.html',
-        actresses=rows, view=view, q=q, page=page, total_pages=total_pages, per_page=per_page,
+        actresses=rows, view=view, q=q, page=page, total_pages=total_pages, per_page=per_page, total=total,
+        next_cursor=next_cursor, prev_cursor=prev_cursor, base_qs=base_qs,
         MARITAL_STATUS_OPTIONS=MARITAL_STATUS_OPTIONS,
         CHILDREN_OPTIONS=CHILDREN_OPTIONS,
         RELIGION_OPTIONS=RELIGION_OPTIONS,
@@ -435,37 +2143,86 @@ def index():
         HAIR_COLOR_OPTIONS=HAIR_COLOR_OPTIONS,
         OCCUPATION_CATEGORY_OPTIONS=OCCUPATION_CATEGORY_OPTIONS,
         STATUS_OPTIONS=STATUS_OPTIONS,
-        missing_thumbs=missing, sort_by=sort_by,
-        tags=tags, age_min=age_min, age_max=age_max, height_min=height_min, height_max=height_max,
+        missing_thumbs=missing, thumbs=thumbs, sort_by=sort_by,
+        tags=tags, tag_mode=filters['tag_mode'], age_min=age_min, age_max=age_max, height_min=height_min, height_max=height_max,
         occupation_filter=occupation_filter, tag_filter=tag_filter)
 
+def media_version(mtime, size):
+    """
+    ETag, and ?v= token for /media URLs, from a file's st_mtime (microseconds)
+    and size. A URL carrying the file's current token is cached as immutable.
+    """
+    return f'{round(mtime * 1_000_000):x}-{size:x}'
+
 @app.route('/media/<path:filename>')
 def media(filename):
-    return send_from_directory(MEDIA_ROOT, filename)
+    """
+    Media files with a strong ETag (mtime and size), conditional GET and byte
+    ranges, served by send_file, or with MEDIA_OFFLOAD handed to the front proxy
+    once the 304 check is done here, so the worker is free during the transfer.
+    """
+    path = safe_join(MEDIA_ROOT, filename)
+    if not path or not os.path.isfile(path):
+        return 'Not found', 404
+    st = os.stat(path)
+    etag = media_version(st.st_mtime, st.st_size)
+    immutable = request.args.get('v') == etag
+    max_age = MEDIA_IMMUTABLE_MAX_AGE if immutable else MEDIA_MAX_AGE
+    if MEDIA_OFFLOAD in ('x-accel', 'x-sendfile'):
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            resp = Response(mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            if MEDIA_OFFLOAD == 'x-accel':
+                rel = os.path.relpath(path, MEDIA_ROOT).replace(os.sep, '/')
+                resp.headers['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX + quote(rel)
+            else:
+                resp.headers['X-Sendfile'] = os.path.abspath(path)
+        resp.set_etag(etag)
+        resp.last_modified = st.st_mtime
+        resp.cache_control.public = True
+        resp.cache_control.max_age = max_age
+    else:
+        resp = send_file(path, etag=etag, max_age=max_age, last_modified=st.st_mtime, conditional=True)
+        resp.accept_ranges = 'bytes'  # advertised on full responses too, so players seek with Range
+    if immutable:
+        resp.cache_control.immutable = True
+    return resp
+
+@app.route('/thumb/<folder>/<path:filename>')
+def thumb(folder, filename):
+    src_path = safe_join(MEDIA_ROOT, folder, filename)
+    if not src_path or not os.path.isfile(src_path) or media_kind(filename) != 'image':
+        return 'Not found', 404
+    if not PIL_AVAILABLE:
+        return redirect(url_for('media', filename=f'{folder}/{filename}'))
+    size = thumb_size_for(request.args.get('w', 200, type=int))
+    fmt = 'webp' if request.args.get('fmt') == 'webp' else 'jpeg'
+    cache_path = thumb_cache_path(src_path, size, fmt)
+    if os.path.exists(cache_path):
+        os.utime(cache_path)  # mark as recently used for eviction
+    else:
+        try:
+            prune_thumb_cache(render_thumbnail(src_path, cache_path, size, fmt))
+        except Exception as e:
+            print(f"Thumbnail failed for {src_path}: {e}")
+            return redirect(url_for('media', filename=f'{folder}/{filename}'))
+    return send_file(cache_path, mimetype=f'image/{fmt}', max_age=86400)
 
 @app.route('/add', methods=['GET','POST'])
 def add_actress():
     form = ActressForm()
     if form.validate_on_submit():
         data = {k: v.data for k,v in form._fields.items() if k != 'csrf_token'}
-        # Enhanced dupe check with fuzzy matching
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute('SELECT id, name FROM actresses WHERE lower(name) LIKE lower(?)', (f"%{data['name']}%",))
-        existing = cur.fetchall()
-        if existing:
+        # Enhanced dupe check with fuzzy matching (name_key index + trigram postings)
+        exact, similars = find_similar_names(data['name'])
+        if exact or similars:
             # Exact match first
-            exact = next((r for r in existing if fuzz.ratio(r['name'], data['name']) == 100), None)
             if exact:
-                flash(f'Exact duplicate "{data["name"]}" already exists (ID: {exact["id"]})', 'error')
+                flash(f'Exact duplicate "{data["name"]}" already exists (ID: {exact[0]["id"]})', 'error')
             else:
                 # Fuzzy near-matches
-                similars = [r for r in existing if fuzz.ratio(r['name'], data['name']) > 85]
-                if similars:
-                    flash(f'Potential duplicates found: {", ".join([s["name"] for s in similars[:3]])} (similar to "{data["name"]}"). Proceed?', 'warning')
-                else:
-                    # No issue, proceed
-                    pass
-            conn.close()
+                flash(f'Potential duplicates found: {", ".join([s["name"] for s in similars[:3]])} (similar to "{data["name"]}"). Proceed?', 'warning')
             thumbnail_path = None  # No actress yet
             return render_template('form.html',
                 form=form, actress={}, thumbnail_path=thumbnail_path,
@@ -481,7 +2238,7 @@ def add_actress():
             ext = os.path.splitext(secure_filename(thumb.filename))[1]
             save_path = os.path.join(folder_path, 'thumbnail' + ext); thumb.save(save_path); data['has_pictures'] = 1
         data['folder_name'] = folder_name; _insert_actress(data); 
-        conn.close()
+        catalog_folder(folder_name)
         flash('Actress added successfully', 'success'); return redirect(url_for('index'))
     # GET: Render empty form
     thumbnail_path = None
@@ -494,7 +2251,7 @@ def add_actress():
 
 @app.route('/edit/<int:actress_id>', methods=['GET','POST'])
 def edit_actress(actress_id):
-    conn = get_conn(); cur = conn.cursor(); cur.execute('SELECT * FROM actresses WHERE id=?', (actress_id,)); actress = cur.fetchone(); conn.close()
+    conn = get_conn(); cur = conn.cursor(); cur.execute('SELECT * FROM actresses WHERE id=?', (actress_id,)); actress = cur.fetchone()
     if not actress:
         flash('Not found', 'error'); return redirect(url_for('index'))
     form = ActressForm(obj=actress)
@@ -502,11 +2259,10 @@ def edit_actress(actress_id):
         data = {k: v.data for k,v in form._fields.items() if k != 'csrf_token'}
         # Dupe check (exclude self)
         conn = get_conn(); cur = conn.cursor()
-        cur.execute('SELECT id FROM actresses WHERE lower(name)=lower(?) AND id != ?', (data['name'], actress_id))
+        cur.execute('SELECT id FROM actresses WHERE name_key=? AND id != ?', (normalize_name(data['name']), actress_id))
         existing = cur.fetchone()
         if existing:
             flash('Duplicate name detected', 'error')
-            conn.close()
             return render_template('form.html', form=form, actress=actress)
         new_folder = data.get('folder_name') or safe_folder_name(data.get('name') or actress['name'])
         old_folder = actress['folder_name'] or ''
@@ -524,7 +2280,8 @@ def edit_actress(actress_id):
             ext = os.path.splitext(secure_filename(thumb.filename))[1]
             save_path = os.path.join(MEDIA_ROOT, new_folder, 'thumbnail' + ext); thumb.save(save_path); data['has_pictures'] = 1
         data['folder_name'] = new_folder; _update_actress(actress_id, data); 
-        conn.close()
+        if old_folder and old_folder != new_folder: catalog_folder(old_folder)
+        catalog_folder(new_folder)
         flash('Actress updated', 'success'); return redirect(url_for('index'))
     thumbnail_path = get_thumbnail_path(actress['folder_name']) if actress['folder_name'] else None
     return render_template('form.html', form=form, actress=actress,
@@ -542,9 +2299,7 @@ def delete_actress(actress_id):
         recycle = request.form.get('recycle', 'false') in ('1','true','yes','on')
     conn = get_conn(); cur = conn.cursor(); cur.execute('SELECT folder_name FROM actresses WHERE id=?', (actress_id,)); row = cur.fetchone(); folder = row['folder_name'] if row else None
     cur.execute('DELETE FROM actresses WHERE id=?', (actress_id,)); 
-    # Delete from FTS
-    cur.execute('DELETE FROM actresses_fts WHERE rowid=?', (actress_id,))
-    conn.commit(); conn.close()
+    conn.commit()
     if folder:
         folder_path = os.path.join(MEDIA_ROOT, folder)
         try:
@@ -556,17 +2311,94 @@ def delete_actress(actress_id):
                 if os.path.isdir(folder_path): shutil.rmtree(folder_path)
         except Exception as e:
             flash(f'Failed to handle media folder: {e}', 'error')
+        if recycle or DELETE_MEDIA_ON_REMOVE: catalog_folder(folder)
     flash('Deleted', 'info')
     return jsonify({'ok': True}) if request.is_json else redirect(url_for('index'))
 
 @app.route('/scan_missing')
 def scan_missing():
-    conn = get_conn(); cur = conn.cursor(); cur.execute('SELECT id, name, folder_name FROM actresses'); rows = cur.fetchall(); conn.close()
-    missing = []
-    for r in rows:
-        if not r['folder_name'] or not get_thumbnail_path(r['folder_name']):
-            missing.append({'id': r['id'], 'name': r['name'], 'folder': r['folder_name']})
-    return jsonify({'missing': missing})
+    # ?rescan=1 picks up files dropped into MEDIA_ROOT outside the app (changed folders only, ?full=1 for all)
+    rescan, full = bool(request.args.get('rescan')), bool(request.args.get('full'))
+    if wants_job():
+        def run(progress):
+            scanned, removed = rescan_media(full=full, progress=progress) if rescan else (0, 0)
+            return {'scanned': scanned, 'removed': removed, 'missing': get_missing_thumbnails()}
+        return job_response(submit_job('scan_missing', run))
+    if rescan:
+        rescan_media(full=full)
+    return jsonify({'missing': get_missing_thumbnails()})
+
+@app.cli.command('rescan-media')
+@click.option('--full', is_flag=True, help='Re-list every folder, not only ones whose mtime changed.')
+def rescan_media_command(full):
+    """Refresh the media_files catalog from MEDIA_ROOT."""
+    with transaction():
+        scanned, removed = rescan_media(full=full)
+    print(f'Media catalog updated: {scanned} folders scanned, {removed} removed')
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild actresses_fts from the actresses table (normally kept in sync by triggers)."""
+    with transaction():
+        rebuild_search_index()
+    print('Search index rebuilt')
+
+@app.cli.command('rebuild-merge-candidates')
+@click.option('--workers', type=int, default=None, help='Process pool size for scoring (default: CPU count).')
+def rebuild_merge_candidates_command(workers):
+    """Recompute every near-duplicate pair from scratch."""
+    with transaction():
+        rescored = refresh_merge_candidates(full=True, workers=workers)
+        pairs = get_conn().execute('SELECT COUNT(*) FROM merge_candidates').fetchone()[0]
+    print(f'Merge candidates rebuilt: {rescored} names, {pairs} pairs')
+
+@app.cli.command('refresh-ages')
+@click.option('--full', is_flag=True, help='Check every row, not only birthdays since the last run.')
+def refresh_ages_command(full):
+    """Recompute ages from dob_iso (the scheduler does this nightly)."""
+    with transaction():
+        changed = refresh_ages(full=full)
+    print(f'Ages refreshed: {changed} changed')
+
+@app.cli.command('prune-backups')
+@click.option('--keep', type=int, default=None, help='Backups to keep (default: BACKUP_KEEP).')
+def prune_backups_command(keep):
+    """Delete old backups and the media blobs only they referenced."""
+    removed, blobs, freed = prune_backups(keep)
+    print(f'Pruned {removed} backups and {blobs} media blobs ({freed / 1024 / 1024:.1f} MB freed)')
+
+@app.cli.command('sync-social')
+@click.option('--ttl-hours', type=float, default=SOCIAL_SYNC_TTL_HOURS, show_default=True, help='Skip profiles synced more recently.')
+@click.option('--workers', type=int, default=SOCIAL_SYNC_WORKERS, show_default=True)
+def sync_social_command(ttl_hours, workers):
+    """Refresh Twitter/Instagram follower counts for all profiles."""
+    with transaction():
+        summary = sync_social_profiles(ttl_hours, workers)
+    print(f"Social sync: {summary['updated']} updated, {summary['failed']} failed, "
+          f"{summary['skipped_fresh']} still fresh ({summary['seconds']}s)")
+
+@app.cli.command('pregen-thumbs')
+@click.option('--size', '-s', 'sizes', multiple=True, type=int, default=(64, 200), show_default=True)
+@click.option('--fmt', type=click.Choice(['jpeg', 'webp']), default='jpeg', show_default=True)
+@click.option('--workers', type=int, default=None, help='Process pool size (default: CPU count).')
+def pregen_thumbs_command(sizes, fmt, workers):
+    """Render cached thumbnails for every catalogued image in MEDIA_ROOT."""
+    if not PIL_AVAILABLE:
+        raise click.ClickException('Pillow is not installed: pip install pillow')
+    conn = get_conn(); cur = conn.cursor()
+    cur.execute("SELECT folder, filename FROM media_files WHERE kind='image'")
+    sources = [os.path.join(MEDIA_ROOT, r['folder'], r['filename']) for r in cur.fetchall()]
+    sizes = sorted({thumb_size_for(s) for s in sizes})
+    done = failed = written = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_pregen_thumb, src, size, fmt) for src in sources for size in sizes]
+        for fut in as_completed(futures):
+            try:
+                written += fut.result(); done += 1
+            except Exception:
+                failed += 1
+    prune_thumb_cache()
+    print(f'Thumbnails: {done} ready, {failed} failed, {written / 1024 / 1024:.1f} MB written')
 
 # --------------------------
 # New Routes for Features
@@ -574,13 +2406,34 @@ def scan_missing():
 @app.route('/scrape/<name>')
 def scrape_name(name):
     try:
-        url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name.replace(' ', '_')}"
-        resp = requests.get(url, timeout=5)
-        data = resp.json()
-        bio = data.get('extract', '')[:500]
-        return jsonify({'description': bio})
+        extract, cached = wikipedia_summary_cached(name)
     except Exception as e:
         return jsonify({'error': str(e)})
+    resp = jsonify({'description': extract or ''})
+    resp.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+    return resp
+
+@app.route('/scrape_batch', methods=['POST'])
+@csrf.exempt
+def scrape_batch():
+    # JSON {"names": [...]} (no CSRF token needed) or repeated form field "names"
+    # with csrf_token; fills the /scrape cache
+    protect_api_post()
+    payload = request.get_json(silent=True)
+    if payload is not None and not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object {"names": [...]}'}), 400
+    names = payload.get('names') if payload else request.form.getlist('names')
+    if not isinstance(names, list) or not all(isinstance(n, str) for n in names) or not names:
+        return jsonify({'error': 'Expected a non-empty list of names'}), 400
+    if len(names) > SCRAPE_BATCH_MAX:
+        return jsonify({'error': f'At most {SCRAPE_BATCH_MAX} names per batch'}), 400
+    if wants_job():
+        def run(progress):
+            results, stats = prefetch_summaries(names, progress=progress)
+            return dict(stats, found=sum(1 for v in results.values() if v))
+        return job_response(submit_job('scrape_batch', run))
+    results, stats = prefetch_summaries(names)
+    return jsonify(dict(stats, results={k: v or '' for k, v in results.items()}))
 
 @app.route('/bulk', methods=['POST'])
 def bulk_ops():
@@ -593,30 +2446,36 @@ def bulk_ops():
     if action == 'delete':
         for iid in ids:
             cur.execute('DELETE FROM actresses WHERE id=?', (iid,))
-            cur.execute('DELETE FROM actresses_fts WHERE rowid=?', (iid,))
         conn.commit()
     elif action == 'update_status':
         new_status = request.form.get('new_status')
         cur.executemany('UPDATE actresses SET status=? WHERE id=?', [(new_status, iid) for iid in ids])
-        cur.executemany('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) SELECT id, name, aka, description, tags, profession, specialties FROM actresses WHERE id=?', [(iid,) for iid in ids])
         conn.commit()
-    conn.close()
     flash(f'Bulk {action} on {len(ids)} items', 'success')
     return redirect(url_for('index'))
 
 # Bulk Expansion: Merge Duplicates
 @app.route('/merge_candidates')
 def merge_candidates():
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute('SELECT id, name FROM actresses ORDER BY name')
-    rows = cur.fetchall()
-    candidates = []
-    for i, r1 in enumerate(rows):
-        for r2 in rows[i+1:]:
-            if fuzz.ratio(r1['name'], r2['name']) > 80:
-                candidates.append({'id1': r1['id'], 'name1': r1['name'], 'id2': r2['id'], 'name2': r2['name'], 'score': fuzz.ratio(r1['name'], r2['name'])})
-    conn.close()
-    return render_template('merge.html', candidates=candidates)  # Assume merge.html exists or add
+    if wants_job():
+        return job_response(submit_job('merge_candidates', lambda progress: {'rescored': refresh_merge_candidates(progress=progress)}))
+    refresh_merge_candidates()
+    page = max(request.args.get('page', 1, type=int), 1)
+    cur = get_conn().cursor()
+    total = cur.execute('SELECT COUNT(*) FROM merge_candidates').fetchone()[0]
+    cur.execute('''
+    SELECT m.score,
+           a.id AS id1, a.name AS name1, a.folder_name AS folder1, a.age AS age1, a.status AS status1,
+           b.id AS id2, b.name AS name2, b.folder_name AS folder2, b.age AS age2, b.status AS status2
+    FROM merge_candidates m
+    JOIN actresses a ON a.id = m.id1
+    JOIN actresses b ON b.id = m.id2
+    ORDER BY m.score DESC, m.id1, m.id2
+    LIMIT ? OFFSET ?
+    ''', (MERGE_PER_PAGE, (page - 1) * MERGE_PER_PAGE))
+    candidates = [dict(r) for r in cur.fetchall()]
+    return render_template('merge.html', candidates=candidates, total=total, page=page,
+                           total_pages=max(1, math.ceil(total / MERGE_PER_PAGE)))
 
 @app.route('/merge/<int:id1>/<int:id2>', methods=['POST'])
 def merge_actresses(id1, id2):
@@ -630,31 +2489,115 @@ def merge_actresses(id1, id2):
     _update_actress(id1, act1)
     # Delete act2
     cur.execute('DELETE FROM actresses WHERE id=?', (id2,))
-    cur.execute('DELETE FROM actresses_fts WHERE rowid=?', (id2,))
     # Move media if different
     if act1['folder_name'] != act2['folder_name']:
         old_path = os.path.join(MEDIA_ROOT, act2['folder_name'])
         if os.path.exists(old_path):
             shutil.move(old_path, os.path.join(MEDIA_ROOT, act1['folder_name']))
-    conn.commit(); conn.close()
+    conn.commit()
+    catalog_folder(act1['folder_name'])
+    if act2['folder_name'] != act1['folder_name']: catalog_folder(act2['folder_name'])
     flash('Merged successfully', 'success')
     return redirect(url_for('index'))
 
-@app.route('/gallery/<int:actress_id>')
-def gallery(actress_id):
-    conn = get_conn(); cur = conn.cursor()
-    cur.execute('SELECT folder_name FROM actresses WHERE id=?', (actress_id,))
-    row = cur.fetchone()
+# Gallery pages come from the media_files catalog (kept fresh by
+# ensure_folder_listed), GALLERY_PAGE_SIZE images at a time, keyset-paginated
+# by (sort column, filename) so deep pages cost the same as the first.
+GALLERY_SORTS = {'name': 'filename', 'mtime': 'mtime', 'size': 'size'}
+GALLERY_PAGE_SIZE = 60
+GALLERY_MAX_PAGE_SIZE = 500
+
+def encode_gallery_cursor(sort, order, row):
+    raw = json.dumps([sort, order, row[GALLERY_SORTS[sort]], row['filename']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_gallery_cursor(cursor, sort, order):
+    """(value, filename) from encode_gallery_cursor, or None if malformed or for another sort/order."""
+    try:
+        cur_sort, cur_order, value, filename = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        return None
+    if (cur_sort, cur_order) != (sort, order) or not isinstance(filename, str):
+        return None
+    return value, filename
+
+def gallery_page(folder_name, sort='name', order='asc', limit=GALLERY_PAGE_SIZE, seek=None):
+    """
+    One page of a folder's images as (rows, has_more), ordered by (sort, filename)
+    and starting after seek, a decoded gallery cursor.
+    """
+    col = GALLERY_SORTS[sort]
+    op, direction = ('>', 'ASC') if order == 'asc' else ('<', 'DESC')
+    where = ["folder = ?", "kind = 'image'"]; params = [folder_name]
+    if seek and col == 'filename':
+        where.append(f'filename {op} ?'); params.append(seek[1])
+    elif seek:
+        where.append(f'({col}, filename) {op} (?, ?)'); params.extend(seek)
+    rows = get_conn().execute(f"""
+        SELECT filename, size, mtime FROM media_files WHERE {' AND '.join(where)}
+        ORDER BY {col} {direction}, filename {direction} LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    return rows[:limit], len(rows) > limit
+
+def gallery_total(folder_name):
+    return get_conn().execute("SELECT COUNT(*) FROM media_files WHERE folder=? AND kind='image'", (folder_name,)).fetchone()[0]
+
+def gallery_item(folder, row):
+    return {
+        'name': row['filename'], 'size': row['size'], 'mtime': row['mtime'],
+        'url': url_for('media', filename=f"{folder}/{row['filename']}", v=media_version(row['mtime'], row['size'])),
+        'thumb': url_for('thumb', folder=folder, filename=row['filename'], w=200),
+    }
+
+def gallery_folder(actress_id):
+    """(folder_name, error response); the folder's listing is fresh when there is no error."""
+    row = get_conn().execute('SELECT folder_name FROM actresses WHERE id=?', (actress_id,)).fetchone()
     folder = row['folder_name'] if row else None
-    conn.close()
     if not folder:
-        return 'Not found', 404
-    folder_path = os.path.join(MEDIA_ROOT, folder)
-    if not os.path.isdir(folder_path):
-        return 'Folder not found', 404
-    files = [f for f in os.listdir(folder_path) if f.rsplit('.',1)[1].lower() in ALLOWED_IMAGE_EXT]
+        return None, ('Not found', 404)
+    if not safe_join(MEDIA_ROOT, folder) or not ensure_folder_listed(folder):
+        return None, ('Folder not found', 404)
+    return folder, None
+
+@app.route('/api/gallery/<int:actress_id>')
+def api_gallery(actress_id):
+    """?sort=name|mtime|size&order=asc|desc&limit=N&cursor=<next_cursor of the previous page>"""
+    folder, error = gallery_folder(actress_id)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    sort = request.args.get('sort', 'name')
+    order = request.args.get('order', 'desc' if sort in ('mtime', 'size') else 'asc')
+    if sort not in GALLERY_SORTS or order not in ('asc', 'desc'):
+        return jsonify({'error': f"sort must be one of {', '.join(GALLERY_SORTS)}; order asc or desc"}), 400
+    limit = max(1, min(request.args.get('limit', GALLERY_PAGE_SIZE, type=int), GALLERY_MAX_PAGE_SIZE))
+    cursor = request.args.get('cursor')
+    seek = decode_gallery_cursor(cursor, sort, order) if cursor else None
+    if cursor and seek is None:
+        return jsonify({'error': 'Invalid cursor for this sort'}), 400
+    rows, has_more = gallery_page(folder, sort, order, limit, seek)
+    total = gallery_total(folder)
+    return jsonify({
+        'folder': folder, 'sort': sort, 'order': order, 'total': total,
+        'files': [gallery_item(folder, r) for r in rows],
+        'next_cursor': encode_gallery_cursor(sort, order, rows[-1]) if has_more else None,
+    })
+
+@app.route('/gallery/<int:actress_id>')
+def gallery(actress_id):
+    folder, error = gallery_folder(actress_id)
+    if error:
+        return error
+    sort = request.args.get('sort', 'name')
+    if sort not in GALLERY_SORTS: sort = 'name'
+    order = 'asc' if sort == 'name' else 'desc'
+    # first page rendered inline; the template fetches the rest from /api/gallery as it scrolls
+    rows, has_more = gallery_page(folder, sort, order)
+    files = [gallery_item(folder, r) for r in rows]
+    total = gallery_total(folder)
+    next_cursor = encode_gallery_cursor(sort, order, rows[-1]) if has_more else None
     try:
-        return render_template('gallery.html', files=files, folder=folder, actress_id=actress_id)
+        return render_template('gallery.html', files=files, total=total, next_cursor=next_cursor,
+                               sort=sort, order=order, folder=folder, actress_id=actress_id)
     except ImportError:
         # Fallback if Jinja2 not fully available, but unlikely
         pass
@@ -674,91 +2617,65 @@ def gallery(actress_id):
     <ul>
 """
             for f in files:
-                html += f'        <li><img src="/media/{folder}/{f}" alt="{f}" loading="lazy"></li>\n'
-            html += """    </ul>
-    <p>Total images: {len(files)}</p>
+                html += f'        <li><img src="{f["thumb"]}" alt="{f["name"]}" loading="lazy"></li>\n'
+            html += f"""    </ul>
+    <p>Showing {len(files)} of {total} images</p>
 </body>
 </html>"""
             return html, 200, {'Content-Type': 'text/html'}
         else:
             raise e
 
+def get_dashboard_summary():
+    """Dashboard data from the trigger-maintained dashboard_counts table, plus its version."""
+    cur = get_conn().cursor()
+    cur.execute("SELECT version FROM data_versions WHERE name='dashboard'")
+    row = cur.fetchone(); version = row[0] if row else 0
+    cur.execute('SELECT dimension, value, count FROM dashboard_counts ORDER BY dimension, value')
+    counts = {}
+    for r in cur.fetchall():
+        counts.setdefault(r['dimension'], []).append((r['value'], r['count']))
+    total = sum(c for _, c in counts.get('total', []))
+    with_media = sum(c for _, c in counts.get('with_media', []))
+    return {
+        'total': total,
+        'with_media': with_media,
+        'missing_thumbs': total - with_media,
+        'age_data': [{'age': v, 'count': c} for v, c in counts.get('age', [])],
+        'eth_data': [{'ethnicity': v, 'count': c} for v, c in counts.get('ethnicity', [])],
+        'occ_data': [{'category': v, 'count': c} for v, c in counts.get('occupation_category', [])],
+        'status_data': [{'status': v or 'Unknown', 'count': c} for v, c in counts.get('status', [])],
+    }, version
+
 @app.route('/dashboard')
 def dashboard():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Get all real column names from the actresses table
-    cur.execute("PRAGMA table_info(actresses)")
-    columns = [row['name'] for row in cur.fetchall()]
-
-    # Default values
-    age_data = []
-    eth_data = []
-    occ_data = []
-    status_data = []
-    total_actresses = 0
-    with_media_count = 0
-
-    try:
-        # Total number of actresses (always works)
-        cur.execute("SELECT COUNT(*) FROM actresses")
-        total_actresses = cur.fetchone()[0]
-
-        # Age distribution – only if column exists
-        if 'age' in columns:
-            cur.execute('SELECT age, COUNT(*) FROM actresses WHERE age IS NOT NULL GROUP BY age ORDER BY age')
-            age_data = [{'age': row[0], 'count': row[1]} for row in cur.fetchall()]
-
-        # Ethnicity
-        if 'ethnicity' in columns:
-            cur.execute('SELECT ethnicity, COUNT(*) FROM actresses WHERE ethnicity IS NOT NULL AND ethnicity != "" GROUP BY ethnicity')
-            eth_data = [{'ethnicity': row[0], 'count': row[1]} for row in cur.fetchall()]
-
-        # Occupation category
-        if 'occupation_category' in columns:
-            cur.execute('SELECT occupation_category, COUNT(*) FROM actresses WHERE occupation_category IS NOT NULL AND occupation_category != "" GROUP BY occupation_category')
-            occ_data = [{'category': row[0], 'count': row[1]} for row in cur.fetchall()]
-
-        # Status
-        if 'status' in columns:
-            cur.execute('SELECT status, COUNT(*) FROM actresses WHERE status IS NOT NULL GROUP BY status')
-            status_data = [{'status': row[0] or 'Unknown', 'count': row[1]} for row in cur.fetchall()]
-
-        # Media count – only check columns that actually exist
-        media_conditions = []
-        if 'thumbnail' in columns:
-            media_conditions.append("thumbnail IS NOT NULL AND thumbnail != ''")
-        if 'video_path' in columns:
-            media_conditions.append("video_path IS NOT NULL AND video_path != ''")
-        if 'video_url' in columns:
-            media_conditions.append("video_url IS NOT NULL AND video_url != ''")
-
-        if media_conditions:
-            query = f"SELECT COUNT(*) FROM actresses WHERE {' OR '.join(media_conditions)}"
-            cur.execute(query)
-            with_media_count = cur.fetchone()[0]
-        else:
-            with_media_count = 0  # No media columns yet
-
-    except Exception as e:
-        print("Warning: Dashboard query failed (non-fatal):", e)
-
-    finally:
-        conn.close()
-
+    summary, _ = get_dashboard_summary()
     current_date = datetime.now().strftime('%B %d, %Y')
 
     return render_template('dashboard.html',
-        age_data=age_data,
-        eth_data=eth_data,
-        occ_data=occ_data,
-        status_data=status_data,
-        total=total_actresses,
-        with_media=with_media_count,
+        age_data=summary['age_data'],
+        eth_data=summary['eth_data'],
+        occ_data=summary['occ_data'],
+        status_data=summary['status_data'],
+        total=summary['total'],
+        with_media=summary['with_media'],
         current_date=current_date
     )
 
+@app.route('/api/dashboard')
+def api_dashboard():
+    # ETag follows the summary version, so pollers get a 304 until a counted field changes
+    etag = f'dashboard-{data_version("dashboard")}'
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        summary, version = get_dashboard_summary()
+        resp = jsonify(summary)
+        etag = f'dashboard-{version}'
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
 # Social Media Sync
 @app.route('/sync/<int:actress_id>')
 def sync_social(actress_id):
@@ -767,50 +2684,133 @@ def sync_social(actress_id):
     row = cur.fetchone()
     if not row:
         return 'Not found', 404
-    updates = {}
+    from social_sync import sync_twitter, sync_instagram
+    updates = {}; errors = []
     if row['twitter']:
-        twitter_data = sync_twitter(row['twitter'].lstrip('@'))
+        twitter_data = sync_twitter(row['twitter'].lstrip('@'), TWITTER_BEARER)
         if 'error' not in twitter_data:
             updates['twitter_followers'] = twitter_data['followers_count']
+        else:
+            errors.append(f"twitter_followers: {twitter_data['error']}"[:200])
     if row['instagram']:
         ig_data = sync_instagram(row['instagram'].lstrip('@'))
         if 'error' not in ig_data:
             updates['ig_followers'] = ig_data['followers_count']
+        else:
+            errors.append(f"ig_followers: {ig_data['error']}"[:200])
+    save_social_sync([(actress_id, updates, errors)])
     # Update DB if updates
     if updates:
         updates_str = f"\n\nSocial Sync {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: {json.dumps(updates)}"
         cur.execute('UPDATE actresses SET description = COALESCE(description, "") || ? WHERE id=?', (updates_str, actress_id))
-        cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) SELECT id, name, aka, description, tags, profession, specialties FROM actresses WHERE id=?', (actress_id,))
         conn.commit()
-    conn.close()
     return jsonify(updates or {'message': 'No updates'})
 
+def save_social_sync(results):
+    """Record [(actress_id, updates, errors)] in social_sync; counts that failed to refresh keep their old value."""
+    now = time.time()
+    get_conn().executemany('''
+        INSERT INTO social_sync (actress_id, synced_at, twitter_followers, ig_followers, error) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(actress_id) DO UPDATE SET
+            synced_at = excluded.synced_at,
+            twitter_followers = COALESCE(excluded.twitter_followers, twitter_followers),
+            ig_followers = COALESCE(excluded.ig_followers, ig_followers),
+            error = excluded.error
+    ''', [(i, now, u.get('twitter_followers'), u.get('ig_followers'), '; '.join(e) or None) for i, u, e in results])
+
+def sync_social_profiles(ttl_hours=SOCIAL_SYNC_TTL_HOURS, workers=SOCIAL_SYNC_WORKERS, progress=None):
+    """
+    Bulk follower refresh for every profile with a Twitter or Instagram handle
+    not synced within ttl_hours (see social_sync.bulk_sync). Results go to the
+    social_sync table; unlike /sync/<id>, descriptions are not appended to.
+    """
+    from social_sync import bulk_sync
+    cutoff = time.time() - ttl_hours * 3600
+    cur = get_conn().cursor()
+    rows = cur.execute('''
+        SELECT a.id, a.twitter, a.instagram FROM actresses a
+        LEFT JOIN social_sync s ON s.actress_id = a.id
+        WHERE (COALESCE(a.twitter, '') != '' OR COALESCE(a.instagram, '') != '')
+          AND (s.synced_at IS NULL OR s.synced_at < ?)
+    ''', (cutoff,)).fetchall()
+    fresh = cur.execute('SELECT COUNT(*) FROM social_sync WHERE synced_at >= ?', (cutoff,)).fetchone()[0]
+    profiles = [(r['id'], (r['twitter'] or '').strip().lstrip('@') or None, (r['instagram'] or '').strip().lstrip('@') or None)
+                for r in rows]
+    started = time.perf_counter()
+    updates, errors = bulk_sync(profiles, TWITTER_BEARER, workers=workers,
+                                progress=progress and (lambda done, total: progress(done, total, 'Fetching profiles')))
+    save_social_sync([(i, updates.get(i, {}), errors.get(i, [])) for i, _, _ in profiles])
+    elapsed = time.perf_counter() - started
+    return {
+        'profiles': len(profiles),
+        'updated': len(updates),
+        'failed': len([i for i in errors if i not in updates]),
+        'skipped_fresh': fresh,
+        'seconds': round(elapsed, 3),
+        'profiles_per_sec': round(len(profiles) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+@app.route('/sync_all')
+def sync_all_social():
+    # ?ttl_hours=0 forces a refresh of every profile
+    ttl_hours = request.args.get('ttl_hours', SOCIAL_SYNC_TTL_HOURS, type=float)
+    if wants_job():
+        return job_response(submit_job('sync_social', lambda progress: sync_social_profiles(ttl_hours, progress=progress)))
+    return jsonify(sync_social_profiles(ttl_hours))
+
 @app.route('/pdf/<int:actress_id>')
 def pdf_profile(actress_id):
     conn = get_conn(); cur = conn.cursor()
     cur.execute('SELECT * FROM actresses WHERE id=?', (actress_id,))
     actress_row = cur.fetchone()
     actress = dict(actress_row) if actress_row else None
-    conn.close()
     if not actress:
         return 'Not found', 404
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    story = []
-    styles = getSampleStyleSheet()
-    story.append(Paragraph(actress['name'], styles['Title']))
-    if actress['folder_name']:
-        thumb_path = get_thumbnail_path(actress['folder_name'])
-        if thumb_path and os.path.exists(thumb_path):
-            img = Image(thumb_path, width=2*inch, height=2*inch)
-            story.append(img)
-    story.append(Spacer(1, 12))
-    for key, value in actress.items():
-        if value and key not in ('id', 'folder_name'):
-            story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {value}", styles['Normal']))
-    doc.build(story)
-    buffer.seek(0)
-    return Response(buffer.getvalue(), mimetype='application/pdf', headers={'Content-Disposition': f'attachment;filename={actress["name"].replace(" ", "_")}.pdf'})
+    return send_file(cached_profile_pdf(actress), mimetype='application/pdf', as_attachment=True,
+                     download_name=f'{actress["name"].replace(" ", "_")}.pdf')
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable file that collects writes, so zipfile output can be streamed."""
+    def __init__(self):
+        self.chunks = []
+    def writable(self):
+        return True
+    def write(self, b):
+        self.chunks.append(bytes(b)); return len(b)
+    def drain(self):
+        out = b''.join(self.chunks); self.chunks.clear(); return out
+
+@app.route('/export_pdf')
+def export_pdf():
+    # Profiles matching the list filters as a zip of PDFs (?format=zip, default) or one PDF (?format=pdf, needs pypdf)
+    sql, params = export_query(request.args)
+    fmt = request.args.get('format', 'zip')
+    if fmt == 'pdf':
+        from pdf_export import PYPDF_AVAILABLE, merge_pdfs
+        if not PYPDF_AVAILABLE:
+            return jsonify({'error': 'Single-file catalog export needs pypdf (pip install pypdf); use format=zip'}), 501
+
+        def generate():
+            paths = [path for _, path in iter_catalog_pdfs(sql, params)]
+            with tempfile.TemporaryFile() as out:
+                merge_pdfs(paths, out)
+                out.seek(0)
+                while chunk := out.read(1024 * 1024):
+                    yield chunk
+
+        return Response(stream_with_context(generate()), mimetype='application/pdf',
+                        headers={'Content-Disposition': 'attachment;filename=actresses_catalog.pdf'})
+
+    def generate():
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as zf:  # PDFs are already compressed
+            for actress, path in iter_catalog_pdfs(sql, params):
+                zf.write(path, f'{actress["id"]}_{secure_filename(actress["name"]) or "profile"}.pdf')
+                yield sink.drain()
+        yield sink.drain()
+
+    return Response(stream_with_context(generate()), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment;filename=actresses_catalog.zip'})
 
 # --------------------------
 # Flexible CSV import
@@ -834,105 +2834,315 @@ HEADER_SYNONYMS = {
     # add more if you like...
 }
 
-# flatten mapping: header_lower -> canonical_field
-def build_header_map(fieldnames):
-    fm = {}
-    lower_names = [c.strip().lower() for c in (fieldnames or [])]
-    for canonical, syns in HEADER_SYNONYMS.items():
-        for s in syns:
-            if s in lower_names:
-                fm[canonical] = lower_names.index(s)
-                break
-    # Also try exact column names mapping if present
-    for i, col in enumerate(lower_names):
-        if col in HEADER_SYNONYMS:
-            fm[col] = i
-    return fm, lower_names
+# Exports stream straight from a cursor in fetchmany batches, so memory stays flat
+# whatever the size of the filtered set; ?gzip=1 compresses on the fly.
+EXPORT_BATCH_ROWS = 1000
+CSV_EXPORT_COLUMNS = [
+    ('Name', 'name'), ('AKA', 'aka'), ('Profession', 'profession'), ('OccupationCategory', 'occupation_category'),
+    ('Age', 'age'), ('DOB', 'dob'), ('Birthplace', 'birthplace'), ('Hometown', 'hometown'),
+    ('MaritalStatus', 'marital_status'), ('Children', 'children'), ('Nationality', 'nationality'), ('Religion', 'religion'),
+    ('Ethnicity', 'ethnicity'), ('Height', 'height'), ('Weight', 'weight'), ('Measurements', 'measurements'),
+    ('EyeColor', 'eye_color'), ('HairColor', 'hair_color'), ('Instagram', 'instagram'), ('TikTok', 'tiktok'),
+    ('Twitter', 'twitter'), ('OnlyFans', 'onlyfans'), ('Languages', 'languages'), ('Tags', 'tags'),
+    ('Specialties', 'specialties'), ('Birthday', 'birthday'), ('Country', 'country'), ('Piercings', 'piercings'),
+    ('Tattoo', 'tattoo'), ('Status', 'status'), ('HasVideos', 'has_videos'), ('HasPictures', 'has_pictures'),
+    ('SexualOrientation', 'sexual_orientation'), ('BDSMOrientation', 'bdsm_orientation'), ('Description', 'description'),
+    ('FolderName', 'folder_name'),
+]
+
+def export_query(args):
+    """SQL and params for every row matching the request's filters (no paging)."""
+    sort_by = args.get('sort', 'name')
+    if sort_by not in SORT_COLUMNS:
+        sort_by = 'name'
+    return build_filter_sql(sort_by=sort_by, per_page=None, **filters_from_args(args))
+
+def iter_rows(sql, params, batch=EXPORT_BATCH_ROWS):
+    cur = get_conn().cursor()
+    cur.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return
+        yield rows
+
+def gzip_chunks(chunks):
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = z.compress(chunk.encode('utf-8'))
+        if out:
+            yield out
+    yield z.flush()
+
+def export_response(chunks, filename, mimetype):
+    if request.args.get('gzip') in ('1', 'true', 'yes'):
+        chunks, filename, mimetype = gzip_chunks(chunks), filename + '.gz', 'application/gzip'
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment;filename={filename}'})
 
 @app.route('/export_csv')
 def export_csv():
-    q = request.args.get('q','').strip(); status_filter = request.args.get('status',''); ethnicity_filter = request.args.get('ethnicity',''); occupation_filter = request.args.get('occupation_category',''); tag_filter = request.args.get('tags',''); sort_by = request.args.get('sort','name')
-    age_min = request.args.get('age_min', type=int)
-    age_max = request.args.get('age_max', type=int)
-    height_min = request.args.get('height_min', type=int)
-    height_max = request.args.get('height_max', type=int)
-    sql, params = build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, sort_by, age_min, age_max, height_min, height_max)
-    conn = get_conn(); cur = conn.cursor(); cur.execute(sql, params); rows = cur.fetchall(); conn.close()
-    si = io.StringIO(); cw = csv.writer(si)
-    header = [
-        'Name','AKA','Profession','OccupationCategory','Age','DOB','Birthplace','Hometown',
-        'MaritalStatus','Children','Nationality','Religion','Ethnicity','Height','Weight','Measurements',
-        'EyeColor','HairColor','Instagram','TikTok','Twitter','OnlyFans','Languages','Tags',
-        'Specialties','Birthday','Country','Piercings','Tattoo','Status','HasVideos','HasPictures',
-        'SexualOrientation','BDSMOrientation','Description','FolderName'
-    ]
-    cw.writerow(header)
-    for r in rows:
-        cw.writerow([
-            r.get('name'), r.get('aka'), r.get('profession'), r.get('occupation_category'), r.get('age'), r.get('dob'), r.get('birthplace'), r.get('hometown'),
-            r.get('marital_status'), r.get('children'), r.get('nationality'), r.get('religion'), r.get('ethnicity'), r.get('height'), r.get('weight'), r.get('measurements'),
-            r.get('eye_color'), r.get('hair_color'), r.get('instagram'), r.get('tiktok'), r.get('twitter'), r.get('onlyfans'), r.get('languages'), r.get('tags'),
-            r.get('specialties'), r.get('birthday'), r.get('country'), r.get('piercings'), r.get('tattoo'), r.get('status'), r.get('has_videos'), r.get('has_pictures'),
-            r.get('sexual_orientation'), r.get('bdsm_orientation'), r.get('description'), r.get('folder_name')
-        ])
-    return Response(si.getvalue(), mimetype='text/csv', headers={'Content-Disposition':'attachment;filename=actresses_export.csv'})
+    sql, params = export_query(request.args)
+
+    def generate():
+        si = io.StringIO(); cw = csv.writer(si)
+        cw.writerow([header for header, _ in CSV_EXPORT_COLUMNS])
+        for rows in iter_rows(sql, params):
+            cw.writerows([r[col] for _, col in CSV_EXPORT_COLUMNS] for r in rows)
+            yield si.getvalue()
+            si.seek(0); si.truncate()
+        yield si.getvalue()
+
+    return export_response(generate(), 'actresses_export.csv', 'text/csv')
 
 @app.route('/export_json')
 def export_json():
-    q = request.args.get('q','').strip(); status_filter = request.args.get('status',''); ethnicity_filter = request.args.get('ethnicity',''); occupation_filter = request.args.get('occupation_category',''); tag_filter = request.args.get('tags',''); sort_by = request.args.get('sort','name')
-    age_min = request.args.get('age_min', type=int)
-    age_max = request.args.get('age_max', type=int)
-    height_min = request.args.get('height_min', type=int)
-    height_max = request.args.get('height_max', type=int)
-    sql, params = build_filter_sql(q, status_filter, ethnicity_filter, occupation_filter, tag_filter, sort_by, age_min, age_max, height_min, height_max)
-    conn = get_conn(); cur = conn.cursor(); cur.execute(sql, params); rows = cur.fetchall(); conn.close()
-    data = [dict(r) for r in rows]
-    return Response(json.dumps(data, indent=2), mimetype='application/json', headers={'Content-Disposition':'attachment;filename=actresses_export.json'})
+    """Filtered rows as a JSON array, or one object per line with ?format=ndjson."""
+    sql, params = export_query(request.args)
+    ndjson = request.args.get('format') == 'ndjson'
+
+    def generate():
+        if ndjson:
+            for rows in iter_rows(sql, params):
+                yield ''.join(json.dumps(dict(r), ensure_ascii=False) + '\n' for r in rows)
+            return
+        sep = '[\n'
+        for rows in iter_rows(sql, params):
+            chunk = []
+            for r in rows:
+                chunk.append(sep + json.dumps(dict(r), ensure_ascii=False)); sep = ',\n'
+            yield ''.join(chunk)
+        yield '[]\n' if sep == '[\n' else '\n]\n'
+
+    if ndjson:
+        return export_response(generate(), 'actresses_export.ndjson', 'application/x-ndjson')
+    return export_response(generate(), 'actresses_export.json', 'application/json')
 
 # Bulk Expansion: JSON Import
+# A JSON array upload is parsed whole; NDJSON (.ndjson/.jsonl, or any file not
+# starting with '[') is read line by line and imported IMPORT_BATCH_ROWS at a time,
+# each batch committed, with errors reported per line.
+IMPORT_BATCH_ROWS = 1000
+IMPORT_ERROR_LIMIT = 20
+JSON_IMPORT_COLUMNS = [col for col, _ in DESIRED_COLUMNS if col not in ('id', 'name_key')]
+
+def iter_ndjson(stream):
+    """(line_no, item, error) for each non-blank line of a binary NDJSON stream."""
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'invalid JSON ({e})'
+            continue
+        if not isinstance(item, dict):
+            yield line_no, None, 'expected a JSON object'
+            continue
+        yield line_no, item, None
+
+def import_json_batch(batch, counts, errors):
+    """Insert the [(line_no, item)] whose names are new; one name lookup for the whole batch."""
+    cur = get_conn().cursor()
+    existing = resolve_names(item.get('name') for _, item in batch if isinstance(item.get('name'), str))
+    inserted = []
+    for line_no, item in batch:
+        name_val = item.get('name')
+        if not name_val or not isinstance(name_val, str):
+            counts['skipped'] += 1; errors.append((line_no, 'missing name'))
+            continue
+        try:
+            data_dict = {col: item.get(col) for col in JSON_IMPORT_COLUMNS}
+            data_dict['age'] = int(data_dict['age']) if data_dict.get('age') else None
+            data_dict.update(dob_fields(data_dict))
+            tags = data_dict.get('tags')
+            if isinstance(tags, list) and all(isinstance(t, str) for t in tags):
+                data_dict['tags'] = ', '.join(tags)  # ["blonde", "tall"] as the tags field would hold it
+            elif tags is not None and not isinstance(tags, str):
+                raise ValueError('tags must be a string or a list of strings')
+            data_dict['folder_name'] = data_dict.get('folder_name') or safe_folder_name(name_val)
+            data_dict.update(normalized_measures(data_dict))
+            data_dict['name_key'] = normalize_name(name_val)
+            if data_dict['name_key'] in existing:
+                counts['skipped'] += 1  # or update logic
+                continue
+            columns = ', '.join(data_dict.keys())
+            placeholders = ', '.join(['?' for _ in data_dict])
+            cur.execute(f'INSERT INTO actresses ({columns}) VALUES ({placeholders})', list(data_dict.values()))
+        except (ValueError, TypeError, sqlite3.Error) as e:
+            counts['skipped'] += 1; errors.append((line_no, str(e)))
+            continue
+        new_id = cur.lastrowid
+        sync_actress_tags(new_id, data_dict.get('tags'))
+        existing[data_dict['name_key']] = {'id': new_id, 'name': name_val}
+        inserted.append((new_id, name_val))
+        counts['upserted'] += 1
+    sync_name_trigrams(inserted, new=True)
+
 @app.route('/import_json', methods=['GET', 'POST'])
 def import_json():
     if request.method == 'POST':
         f = request.files.get('jsonfile')
         if not f:
             flash('No file uploaded', 'error'); return redirect(url_for('import_json'))
-        try:
-            data = json.load(f)
-        except Exception as e:
-            flash(f'Failed to read JSON: {e}', 'error'); return redirect(url_for('import_json'))
-
-        upserted = 0; skipped = 0
-        conn = get_conn(); cur = conn.cursor()
-
-        for item in data:
-            name_val = item.get('name')
-            if not name_val:
-                skipped += 1; continue
+        stream = f.stream
+        gzipped = stream.read(2) == b'\x1f\x8b'  # e.g. an /export_json?...&gzip=1 download
+        stream.seek(0)
+        if gzipped:
+            stream = gzip.GzipFile(fileobj=stream)
+            head = stream.peek(1024)
+        else:
+            head = stream.read(1024); stream.seek(0)
+        ndjson = (f.filename or '').lower().removesuffix('.gz').endswith(('.ndjson', '.jsonl')) or not head.lstrip().startswith(b'[')
+        if ndjson:
+            items = iter_ndjson(stream)
+        else:
+            try:
+                data = json.load(stream)
+            except Exception as e:
+                flash(f'Failed to read JSON: {e}', 'error'); return redirect(url_for('import_json'))
+            items = ((i, item, None if isinstance(item, dict) else 'expected a JSON object') for i, item in enumerate(data, 1))
 
-            data_dict = {col[0]: item.get(col[0]) for col in DESIRED_COLUMNS if col[0] != 'id'}
-            data_dict['age'] = int(data_dict.get('age', 0)) if data_dict.get('age') else None
-            data_dict['folder_name'] = data_dict.get('folder_name') or safe_folder_name(name_val)
+        counts = {'upserted': 0, 'skipped': 0}; errors = []
+        conn = get_conn()
+        while chunk := list(itertools.islice(items, IMPORT_BATCH_ROWS)):
+            for line_no, item, error in chunk:
+                if error:
+                    counts['skipped'] += 1; errors.append((line_no, error))
+            import_json_batch([(line_no, item) for line_no, item, error in chunk if not error], counts, errors)
+            conn.commit()
 
-            # check existing
-            cur.execute('SELECT name, id FROM actresses WHERE lower(name)=lower(?)', (name_val,))
-            existing = cur.fetchone()
-            if existing:
-                skipped += 1  # or update logic
-            else:
-                columns = ', '.join(data_dict.keys())
-                placeholders = ', '.join(['?' for _ in data_dict])
-                cur.execute(f'INSERT INTO actresses ({columns}) VALUES ({placeholders})', list(data_dict.values()))
-                new_id = cur.lastrowid
-                cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) VALUES (?, ?, ?, ?, ?, ?, ?)', 
-                            (new_id, data_dict['name'], data_dict.get('aka'), data_dict.get('description'), data_dict.get('tags'), data_dict.get('profession'), data_dict.get('specialties')))
-                upserted += 1
-
-        conn.commit(); conn.close()
-        flash(f'JSON import complete. Upserted: {upserted}, Skipped: {skipped}', 'success')
+        errors.sort()
+        unit = 'line' if ndjson else 'item'
+        flash(f"JSON import complete. Upserted: {counts['upserted']}, Skipped: {counts['skipped']}", 'success')
+        if errors:
+            shown = '; '.join(f'{unit} {n}: {msg}' for n, msg in errors[:IMPORT_ERROR_LIMIT])
+            more = f' (+{len(errors) - IMPORT_ERROR_LIMIT} more)' if len(errors) > IMPORT_ERROR_LIMIT else ''
+            flash(f'{len(errors)} {unit}s not imported: {shown}{more}', 'warning')
         return redirect(url_for('index'))
 
     return render_template('import_json.html', title='Import JSON')  # Assume template similar to import_csv.html
 
+# CSV import streams the upload through an incremental decoder and works in
+# CSV_IMPORT_BATCH_ROWS chunks: one name_key query per chunk, executemany writes,
+# all inside one transaction with FTS indexing of new rows deferred to the end.
+CSV_IMPORT_BATCH_ROWS = 5000
+CSV_IMPORT_FIELDS = ['aka','profession','age','dob','birthplace','hometown','marital_status','children','nationality','religion','ethnicity','folder_name']
+CSV_WRITE_COLUMNS = CSV_IMPORT_FIELDS + ['dob_iso']
+
+def csv_field_columns(fieldnames):
+    """{field: [column index, ...]} in HEADER_SYNONYMS priority order, worked out once per file."""
+    lower_names = [c.strip().lower() for c in fieldnames]
+    return {field: [i for syn in syns for i, col in enumerate(lower_names) if col == syn]
+            for field, syns in HEADER_SYNONYMS.items()}
+
+def csv_row_data(row, columns):
+    """Mapped fields for one csv.reader row, or None when it has no usable name."""
+    def value_for(field):
+        for i in columns[field]:
+            if i < len(row) and row[i].strip():
+                return row[i].strip()
+        return ''
+    # name by synonyms, falling back to the first non-empty column
+    name_val = value_for('name') or next((v.strip() for v in row if v.strip()), '')
+    if not name_val:
+        return None
+    data = {field: value_for(field) for field in CSV_IMPORT_FIELDS}
+    data['name'] = name_val
+    data['folder_name'] = data['folder_name'] or safe_folder_name(name_val)
+    # normalize age -> int if possible
+    try:
+        data['age'] = int(data['age']) if data['age'] else None
+    except ValueError:
+        data['age'] = None
+    data.update(dob_fields(data))
+    data['name_key'] = normalize_name(name_val)
+    return data
+
+def import_csv_chunk(chunk, mode, counts):
+    """Upsert one chunk of csv_row_data dicts: one name lookup, then executemany updates and inserts."""
+    cur = get_conn().cursor()
+    existing = resolve_name_keys(d['name_key'] for d in chunk)
+    new_rows = {}; updates = []
+    for data in chunk:
+        key = data['name_key']
+        if key in existing or key in new_rows:
+            if mode == 'skip':
+                counts['skipped'] += 1; continue
+            if key in new_rows:  # repeated within the chunk: later values win, as separate updates would
+                new_rows[key].update({c: data[c] for c in CSV_WRITE_COLUMNS})
+            else:
+                updates.append([data[c] for c in CSV_WRITE_COLUMNS] + [existing[key]['id']])
+        else:
+            new_rows[key] = data
+        counts['upserted'] += 1
+    # update only mapped fields present - safe update with many columns
+    cur.executemany(f"UPDATE actresses SET {', '.join([c+'=?' for c in CSV_WRITE_COLUMNS])} WHERE id=?", updates)
+    cols = ['name'] + CSV_WRITE_COLUMNS + ['name_key']
+    cur.executemany(f"INSERT INTO actresses ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                    [[d[c] for c in cols] for d in new_rows.values()])
+    ids = resolve_name_keys(new_rows)
+    inserted = [(ids[key]['id'], d['name']) for key, d in new_rows.items()]
+    cur.executemany('INSERT OR IGNORE INTO temp.fts_pending (id) VALUES (?)', [(i,) for i, _ in inserted])
+    sync_name_trigrams(inserted, new=True)
+
+def import_csv_file(raw, mode, progress=None):
+    """
+    Import a CSV from the binary file object raw in CSV_IMPORT_BATCH_ROWS chunks,
+    all in one transaction. Raises ValueError for files that cannot be read or
+    have no name column; returns the summary sent back to the import page.
+    """
+    # incremental decode: the upload is never held in memory as one bytes/str copy
+    reader = csv.reader(codecs.iterdecode(raw, 'utf-8-sig'))
+    try:
+        fieldnames = next(reader, None)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f'Failed to read CSV: {e}') from e
+    # Check if file is empty
+    if not fieldnames:
+        raise ValueError('Uploaded file is empty.')
+
+    # build header map
+    columns = csv_field_columns(fieldnames)
+    # require name
+    if not columns['name']:
+        raise ValueError('CSV must include a Name column (header like: Name, name, Model Name etc.)')
+
+    counts = {'upserted': 0, 'skipped': 0}
+    conn = get_conn()
+    started = time.perf_counter(); rows_read = 0
+    try:
+        with deferred_fts_inserts(conn):
+            while chunk := list(itertools.islice(reader, CSV_IMPORT_BATCH_ROWS)):
+                rows_read += len(chunk)
+                parsed = [d for d in (csv_row_data(row, columns) for row in chunk) if d]
+                counts['skipped'] += len(chunk) - len(parsed)
+                import_csv_chunk(parsed, mode, counts)
+                if progress: progress(raw.tell(), message=f'{rows_read} rows')
+        conn.commit()
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f'Failed to read CSV near row {rows_read + 1}: {e}') from e
+
+    elapsed = time.perf_counter() - started
+    rows_per_sec = round(rows_read / elapsed) if elapsed > 0 else rows_read
+    return {
+        'success': True,
+        'message': f'CSV import complete. Upserted: {counts["upserted"]}, Skipped: {counts["skipped"]} ({rows_read} rows in {elapsed:.2f}s, {rows_per_sec} rows/s)',
+        'upserted': counts['upserted'],
+        'skipped': counts['skipped'],
+        'rows': rows_read,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': rows_per_sec
+    }
+
+def _import_csv_job(path, mode, progress):
+    try:
+        progress(0, os.path.getsize(path))
+        with open(path, 'rb') as raw:
+            return import_csv_file(raw, mode, progress)
+    finally:
+        os.remove(path)
+
 @app.route('/import_csv', methods=['GET','POST'])
 def import_csv():
     if request.method == 'POST':
@@ -944,130 +3154,28 @@ def import_csv():
             # flash('No file uploaded', 'error') # Removed flash/redirect for AJAX response
             return jsonify({'success': False, 'message': 'No file uploaded'}), 400
 
-        try:
-            # Check if file is empty
-            file_data = f.stream.read()
-            if not file_data:
-                return jsonify({'success': False, 'message': 'Uploaded file is empty.'}), 400
-
-            stream = io.StringIO(file_data.decode('utf-8'))
-            reader = csv.DictReader(stream)
-        except Exception as e:
-            # 2. Handle Read Error (Return JSON)
-            return jsonify({'success': False, 'message': f'Failed to read CSV: {e}'}), 400
-
-        # build header map
-        fieldnames = reader.fieldnames or []
-        header_map, lower_names = build_header_map(fieldnames)
-        
-        # require name
-        if 'name' not in header_map:
-            if 'name' in lower_names:
-                header_map['name'] = lower_names.index('name')
-            else:
-                # 3. Handle Missing Name Column (Return JSON)
-                return jsonify({'success': False, 'message': 'CSV must include a Name column (header like: Name, name, Model Name etc.)'}), 400
-
-        upserted = 0; skipped = 0
-        conn = get_conn(); cur = conn.cursor()
+        if wants_job():
+            # the request stream is gone once we return, so spool the upload for the job
+            fd, path = tempfile.mkstemp(suffix='.csv')
+            with os.fdopen(fd, 'wb') as out:
+                f.save(out)
+            return job_response(submit_job('import_csv', lambda progress: _import_csv_job(path, mode, progress), unit='bytes'))
 
         try:
-            for row in reader:
-                # case-insensitive column access via row with lowered keys:
-                row_lower = {k.strip().lower(): (v or '').strip() for k,v in (row.items())}
-                name_val = None
-                # find name by synonyms
-                for syn in HEADER_SYNONYMS['name']:
-                    if syn in row_lower and row_lower[syn]:
-                        name_val = row_lower[syn]; break
-                if not name_val:
-                    # fallback: first non-empty column
-                    for v in row.values():
-                        if v and v.strip():
-                            name_val = v.strip(); break
-                if not name_val:
-                    skipped += 1; continue
-
-                # map fields opportunistically
-                def value_for(cands):
-                    for c in cands:
-                        if c in row_lower and row_lower[c]:
-                            return row_lower[c]
-                    return ''
-
-                data = {
-                    'name': name_val,
-                    'aka': value_for(HEADER_SYNONYMS.get('aka', [])),
-                    'profession': value_for(HEADER_SYNONYMS.get('profession', [])),
-                    'age': (value_for(['age']) or None),
-                    'dob': value_for(HEADER_SYNONYMS.get('dob', [])),
-                    'birthplace': value_for(HEADER_SYNONYMS.get('birthplace', [])),
-                    'hometown': value_for(HEADER_SYNONYMS.get('hometown', [])),
-                    'marital_status': value_for(HEADER_SYNONYMS.get('marital_status', [])),
-                    'children': value_for(HEADER_SYNONYMS.get('children', [])),
-                    'nationality': value_for(HEADER_SYNONYMS.get('nationality', [])),
-                    'religion': value_for(HEADER_SYNONYMS.get('religion', [])),
-                    'ethnicity': value_for(HEADER_SYNONYMS.get('ethnicity', [])),
-                    'folder_name': value_for(HEADER_SYNONYMS.get('folder_name', [])) or safe_folder_name(name_val)
-                }
-
-                # normalize age -> int if possible
-                try:
-                    data['age'] = int(data['age']) if data['age'] not in (None, '') else None
-                except:
-                    data['age'] = None
-
-                # check existing (case-insensitive name match with fuzzy)
-                cur.execute('SELECT name, id FROM actresses WHERE lower(name)=lower(?)', (data['name'],))
-                existing = cur.fetchone()
-                if existing:
-                    if mode == 'skip':
-                        skipped += 1
-                    else:
-                        # Fuzzy check for merge/skip
-                        if fuzz.ratio(existing['name'], data['name']) < 80:
-                            skipped += 1
-                            continue
-                        
-                        # update only mapped fields present - safe update with many columns
-                        update_cols = ['aka','profession','age','dob','birthplace','hometown','marital_status','children','nationality','religion','ethnicity','folder_name']
-                        set_vals = [data.get(c) for c in update_cols] + [existing['id']]
-                        cur.execute(f"UPDATE actresses SET {', '.join([c+'=?' for c in update_cols])} WHERE id=?", set_vals)
-                        
-                        # Update FTS
-                        cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) SELECT id, name, aka, description, tags, profession, specialties FROM actresses WHERE id=?', (existing['id'],))
-                        upserted += 1
-                else:
-                    cur.execute('INSERT INTO actresses (name, aka, profession, age, dob, birthplace, hometown, marital_status, children, nationality, religion, ethnicity, folder_name) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)', (
-                        data['name'], data['aka'], data['profession'], data['age'], data['dob'], data['birthplace'], data['hometown'],
-                        data['marital_status'], data['children'], data['nationality'], data['religion'], data['ethnicity'], data['folder_name']
-                    ))
-                    new_id = cur.lastrowid
-                    # Insert to FTS
-                    cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) VALUES (?, ?, ?, ?, ?, ?, ?)', 
-                                    (new_id, data['name'], data['aka'], '', '', data['profession'], ''))
-                    upserted += 1
-
-            conn.commit()
-            
-            # 4. SUCCESS RESPONSE: Return JSON instead of redirect
-            return jsonify({
-                'success': True, 
-                'message': f'CSV import complete. Upserted: {upserted}, Skipped: {skipped}',
-                'upserted': upserted,
-                'skipped': skipped
-            }), 200
-
+            result = import_csv_file(f.stream, mode)
+        except ValueError as e:
+            # 2./3. Unreadable file, empty file or no name column (Return JSON)
+            return jsonify({'success': False, 'message': str(e)}), 400
         except Exception as e:
             # 5. Database Error Handling (Return JSON)
-            conn.rollback()
+            get_conn().rollback()
             return jsonify({
                 'success': False, 
                 'message': f'Database Error during import: {e}'
             }), 500
-        
-        finally:
-            conn.close()
+
+        # 4. SUCCESS RESPONSE: Return JSON instead of redirect
+        return jsonify(result), 200
 
     # GET request handler (for displaying the form) - This remains unchanged
     return render_template('import_csv.html',
@@ -1078,39 +3186,222 @@ def import_csv():
     )
 
 # Backup and Recovery
+def _backup_job(progress):
+    backup_name = backup_database(progress=progress)
+    manifest = read_backup_manifest(os.path.join(BACKUP_DIR, backup_name))
+    return {'backup': backup_name, 'stats': manifest['stats']}
+
 @app.route('/backup')
 def backup():
+    if wants_job():
+        return job_response(submit_job('backup', _backup_job))
     backup_name = backup_database(automated=False)
     flash(f'Backup created: {backup_name}', 'success')
     return redirect(url_for('index'))
 
+# Restore stages the new database and media tree next to the live ones, streaming
+# each zip member to disk (nothing is extracted to a temp dir or read whole into
+# memory), validates the staged database, then swaps both in with renames. A
+# failure at any point before the swap leaves the live data untouched.
+RESTORE_COPY_CHUNK = 1024 * 1024
+
+_DUMP_VIRTUAL_TABLE = re.compile(r"INSERT INTO sqlite_master\(type,name,tbl_name,rootpage,sql\)VALUES\('table','([^']+)'")
+
+def _dump_statement_skipped(statement, virtual):
+    # iterdump() writes virtual tables (actresses_fts) straight into sqlite_master
+    # under writable_schema, which cannot be replayed statement by statement.
+    # Their rows and shadow tables are dropped here; the migrations that
+    # ensure_schema re-runs on the restored file recreate and rebuild them.
+    if statement.startswith('PRAGMA writable_schema'):
+        return True
+    m = _DUMP_VIRTUAL_TABLE.match(statement)
+    if m:
+        virtual.add(m.group(1)); return True
+    return any(re.match(rf"""(CREATE TABLE|INSERT INTO) ["']?{re.escape(name)}(_\w+)?["']?[ (]""", statement)
+               for name in virtual)
+
+def _restore_stage_sql(zf, member, dest_path, progress=None):
+    """Replay a legacy iterdump() script into dest_path one statement at a time."""
+    conn = sqlite3.connect(dest_path, isolation_level=None)
+    try:
+        statement = ''; done = reported = 0; virtual = set()
+        with zf.open(member) as raw:
+            for line in io.TextIOWrapper(raw, encoding='utf-8'):
+                statement += line; done += len(line)
+                if sqlite3.complete_statement(statement):
+                    if not _dump_statement_skipped(statement, virtual):
+                        conn.execute(statement)
+                    statement = ''
+                if progress and done - reported >= RESTORE_COPY_CHUNK:
+                    progress(done, member.file_size, 'Replaying SQL dump'); reported = done
+        if conn.in_transaction: conn.execute('COMMIT')
+    finally:
+        conn.close()
+
+def _restore_stage_db(zf, dest_path, progress=None):
+    names = set(zf.namelist())
+    if 'actresses.db' in names:
+        member = zf.getinfo('actresses.db')
+        with zf.open(member) as src, open(dest_path, 'wb') as dst:
+            while chunk := src.read(RESTORE_COPY_CHUNK):
+                dst.write(chunk)
+                if progress: progress(dst.tell(), member.file_size, 'Unpacking database')
+    elif 'actresses.sql' in names:
+        _restore_stage_sql(zf, zf.getinfo('actresses.sql'), dest_path, progress)
+    else:
+        raise ValueError('Backup contains no database (actresses.db or actresses.sql)')
+
+def _restore_stage_media(zf, manifest, dest_dir, progress=None):
+    """Build the media tree in dest_dir from the blob store (manifest backups) or media/ members (legacy)."""
+    os.makedirs(dest_dir)
+    if manifest is not None:
+        media = manifest['media']
+        missing = [rel for rel, entry in media.items() if not find_store_blob(entry[0])]
+        if missing:
+            raise FileNotFoundError(f'{len(missing)} media files of this backup are not in {BACKUP_STORE_DIR} (e.g. {missing[0]})')
+        sources = ((rel, lambda entry=entry: open_store_blob(entry[0])) for rel, entry in media.items())
+        total = len(media)
+    else:
+        members = [m for m in zf.infolist() if m.filename.startswith('media/') and not m.is_dir()]
+        sources = ((m.filename[len('media/'):], lambda m=m: zf.open(m)) for m in members)
+        total = len(members)
+    count = 0
+    for rel, opener in sources:
+        dest = safe_join(dest_dir, rel)
+        if dest is None:
+            raise ValueError(f'Unsafe media path in backup: {rel}')
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with opener() as src, open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst, RESTORE_COPY_CHUNK)
+        count += 1
+        if progress: progress(count, total, 'Restoring media')
+    return count
+
+def _restore_validate(db_path, manifest):
+    """Raise ValueError unless the staged database passes integrity_check and matches the manifest's row counts."""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        result = [r[0] for r in conn.execute('PRAGMA integrity_check')]
+        if result != ['ok']:
+            raise ValueError(f'Restored database failed integrity_check: {"; ".join(result[:5])}')
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='actresses'").fetchone():
+            raise ValueError('Restored database has no actresses table')
+        for table, expected in ((manifest or {}).get('rows') or {}).items():
+            actual = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+            if actual != expected:
+                raise ValueError(f'Restored {table} has {actual} rows, backup recorded {expected}')
+    finally:
+        conn.close()
+
+def _restore_media_path(kind, suffix):
+    # beside MEDIA_ROOT, so the swap is one rename; inside it when MEDIA_ROOT is a mount point
+    if os.path.ismount(MEDIA_ROOT):
+        return os.path.join(MEDIA_ROOT, f'.{kind}-{suffix}')
+    return f'{MEDIA_ROOT}.{kind}-{suffix}'
+
+def _swap_media(staged_media, old_media):
+    """
+    Put the staged tree in place as MEDIA_ROOT, keeping the current one at
+    old_media. Renames the directory itself where possible; a MEDIA_ROOT that
+    cannot be renamed (mount point, busy, other device) has its entries moved
+    instead. Returns a callable that undoes the swap.
+    """
+    try:
+        os.rename(MEDIA_ROOT, old_media)
+    except OSError:
+        pass
+    else:
+        try:
+            os.rename(staged_media, MEDIA_ROOT)
+            return lambda: (os.rename(MEDIA_ROOT, staged_media), os.rename(old_media, MEDIA_ROOT))
+        except OSError:
+            os.rename(old_media, MEDIA_ROOT)
+    skip = {os.path.basename(staged_media), os.path.basename(old_media)}
+    os.makedirs(old_media)
+    old_names, new_names = [], []
+    def undo():
+        for name in new_names: shutil.move(os.path.join(MEDIA_ROOT, name), os.path.join(staged_media, name))
+        for name in old_names: shutil.move(os.path.join(old_media, name), os.path.join(MEDIA_ROOT, name))
+    try:
+        for name in [n for n in os.listdir(MEDIA_ROOT) if n not in skip]:
+            shutil.move(os.path.join(MEDIA_ROOT, name), os.path.join(old_media, name)); old_names.append(name)
+        for name in os.listdir(staged_media):
+            shutil.move(os.path.join(staged_media, name), os.path.join(MEDIA_ROOT, name)); new_names.append(name)
+    except BaseException:
+        undo(); raise
+    return undo
+
+def _restore_swap(staged_db, staged_media, old_media):
+    """
+    Swap the staged media in, then copy the staged DB over the live one with the
+    backup API in a single step: one write transaction on DB_PATH, so pooled
+    connections in every worker see the restored data on their next read and no
+    file (or -wal/-shm) is renamed or unlinked under them.
+    """
+    undo_media = _swap_media(staged_media, old_media)
+    close_conn()  # our own connection may hold a read snapshot the copy would wait on
+    try:
+        src = sqlite3.connect(staged_db)
+        dst = sqlite3.connect(DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        try:
+            src.backup(dst)  # retries while another connection holds the write lock
+        finally:
+            src.close(); dst.close()
+    except BaseException:
+        undo_media()
+        raise
+
+def restore_backup(src, progress=None):
+    """
+    Replace the database and MEDIA_ROOT with the contents of a backup zip (path
+    or seekable file object). Manifest backups need their media blobs in
+    BACKUP_STORE_DIR; legacy backups carry actresses.sql and media/ in the zip.
+    Cancellation is honoured while staging, before anything live is touched.
+    Returns a summary dict.
+    """
+    suffix = uuid.uuid4().hex[:8]
+    staged_db = f'{DB_PATH}.restore-{suffix}'
+    staged_media, old_media = _restore_media_path('restore', suffix), _restore_media_path('old', suffix)
+    try:
+        with zipfile.ZipFile(src) as zf:
+            manifest = json.loads(zf.read('manifest.json')) if 'manifest.json' in zf.namelist() else None
+            _restore_stage_db(zf, staged_db, progress)
+            if progress: progress(0, message='Validating database')
+            _restore_validate(staged_db, manifest)
+            media_files = _restore_stage_media(zf, manifest, staged_media, progress)
+        if progress: progress(media_files, media_files, 'Swapping in restored data')
+        swap_started = time.perf_counter()
+        _restore_swap(staged_db, staged_media, old_media)
+        swap_ms = round((time.perf_counter() - swap_started) * 1000, 2)
+    finally:
+        if os.path.exists(staged_db): os.remove(staged_db)
+        if os.path.exists(staged_media): shutil.rmtree(staged_media)
+        if os.path.isdir(old_media) and not os.listdir(old_media): os.rmdir(old_media)  # an undone entry swap
+    shutil.rmtree(old_media, ignore_errors=True)
+    os.makedirs(RECYCLE_BIN, exist_ok=True)
+    ensure_schema()
+    rescan_media(full=True)
+    return {'restored': True, 'media_files': media_files, 'swap_ms': swap_ms}
+
+def _restore_job(path, progress):
+    try:
+        return restore_backup(path, progress)
+    finally:
+        os.remove(path)
+
 @app.route('/restore', methods=['POST'])
 def restore():
     f = request.files.get('backupfile')
     if not f or not f.filename.endswith('.zip'):
         flash('Invalid backup file', 'error')
         return redirect(url_for('index'))
+    if wants_job():
+        fd, path = tempfile.mkstemp(suffix='.zip')
+        with os.fdopen(fd, 'wb') as out:
+            f.save(out)
+        return job_response(submit_job('restore', lambda progress: _restore_job(path, progress)))
     try:
-        with tempfile.TemporaryDirectory() as tempdir:
-            with zipfile.ZipFile(f) as zf:
-                zf.extractall(tempdir)
-            # Restore DB
-            sql_path = os.path.join(tempdir, 'actresses.sql')
-            if os.path.exists(sql_path):
-                with open(sql_path, 'r', encoding='utf-8') as sqlfile:
-                    sql_script = sqlfile.read()
-                if os.path.exists(DB_PATH):
-                    os.remove(DB_PATH)
-                conn = sqlite3.connect(DB_PATH)
-                conn.executescript(sql_script)
-                conn.close()
-            # Restore media
-            media_src = os.path.join(tempdir, 'media')
-            if os.path.exists(MEDIA_ROOT):
-                shutil.rmtree(MEDIA_ROOT)
-            if os.path.exists(media_src):
-                shutil.copytree(media_src, MEDIA_ROOT)
-        ensure_schema()
+        restore_backup(f)
         flash('Restore successful', 'success')
     except Exception as e:
         flash(f'Restore failed: {e}', 'error')
@@ -1120,35 +3411,40 @@ def restore():
 # DB insert/update helpers
 # --------------------------
 def _insert_actress(data):
+    data = dict(data, **dob_fields(data))
     conn = get_conn(); cur = conn.cursor()
     cur.execute('''
         INSERT INTO actresses (
             name, aka, profession, occupation_category, age, dob, birthplace, hometown, marital_status, children,
             nationality, religion, ethnicity, height, weight, measurements, eye_color, hair_color, instagram, tiktok,
             twitter, onlyfans, languages, tags, specialties, birthday, country, piercings, tattoo, status, has_videos,
-            has_pictures, sexual_orientation, bdsm_orientation, description, folder_name
-        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+            has_pictures, sexual_orientation, bdsm_orientation, description, folder_name,
+            height_cm, weight_kg, bust_cm, waist_cm, hips_cm, name_key, dob_iso
+        ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
     ''', (
         data['name'], data['aka'], data['profession'], data['occupation_category'], data['age'], data['dob'], data['birthplace'],
         data['hometown'], data['marital_status'], data['children'], data['nationality'], data['religion'], data['ethnicity'],
         data['height'], data['weight'], data['measurements'], data['eye_color'], data['hair_color'], data['instagram'],
         data['tiktok'], data['twitter'], data['onlyfans'], data['languages'], data['tags'], data['specialties'],
         data['birthday'], data['country'], data['piercings'], data['tattoo'], data['status'], data['has_videos'],
-        data['has_pictures'], data['sexual_orientation'], data['bdsm_orientation'], data['description'], data['folder_name']
+        data['has_pictures'], data['sexual_orientation'], data['bdsm_orientation'], data['description'], data['folder_name'],
+        *normalized_measures(data).values(), normalize_name(data['name']), data['dob_iso']
     ))
     new_id = cur.lastrowid
-    cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) VALUES (?, ?, ?, ?, ?, ?, ?)', 
-                (new_id, data['name'], data['aka'], data['description'], data['tags'] or '', data['profession'] or '', data['specialties'] or ''))
-    conn.commit(); conn.close()
+    sync_actress_tags(new_id, data['tags'])
+    sync_name_trigrams([(new_id, data['name'])], new=True)
+    return new_id
 
 def _update_actress(actress_id, data):
+    data = dict(data, **dob_fields(data))
     conn = get_conn(); cur = conn.cursor()
     cur.execute('''
         UPDATE actresses SET
             name=?, aka=?, profession=?, occupation_category=?, age=?, dob=?, birthplace=?, hometown=?, marital_status=?, children=?,
             nationality=?, religion=?, ethnicity=?, height=?, weight=?, measurements=?, eye_color=?, hair_color=?, instagram=?, tiktok=?,
             twitter=?, onlyfans=?, languages=?, tags=?, specialties=?, birthday=?, country=?, piercings=?, tattoo=?, status=?, has_videos=?,
-            has_pictures=?, sexual_orientation=?, bdsm_orientation=?, description=?, folder_name=?
+            has_pictures=?, sexual_orientation=?, bdsm_orientation=?, description=?, folder_name=?,
+            height_cm=?, weight_kg=?, bust_cm=?, waist_cm=?, hips_cm=?, name_key=?, dob_iso=?
         WHERE id=?
     ''', (
         data['name'], data['aka'], data['profession'], data['occupation_category'], data['age'], data['dob'], data['birthplace'],
@@ -1157,100 +3453,45 @@ def _update_actress(actress_id, data):
         data['tiktok'], data['twitter'], data['onlyfans'], data['languages'], data['tags'], data['specialties'],
         data['birthday'], data['country'], data['piercings'], data['tattoo'], data['status'], data['has_videos'],
         data['has_pictures'], data['sexual_orientation'], data['bdsm_orientation'], data['description'], data['folder_name'],
+        *normalized_measures(data).values(), normalize_name(data['name']), data['dob_iso'],
         actress_id
     ))
-    cur.execute('INSERT OR REPLACE INTO actresses_fts(rowid, name, aka, description, tags, profession, specialties) VALUES (?, ?, ?, ?, ?, ?, ?)', 
-                (actress_id, data['name'], data['aka'], data['description'], data['tags'] or '', data['profession'] or '', data['specialties'] or ''))
-    conn.commit(); conn.close()
+    sync_actress_tags(actress_id, data['tags'])
+    sync_name_trigrams([(actress_id, data['name'])])
 
-# Scheduler for automated backups (every day at midnight) - optional
+def _scheduled_age_refresh():
+    with transaction():
+        refresh_ages()
+
+# Scheduler for automated backups (every day at midnight) and the nightly age refresh - optional
 scheduler = None
 if SCHEDULER_AVAILABLE:
     scheduler = BackgroundScheduler()
     scheduler.add_job(func=lambda: backup_database(automated=True), trigger="cron", hour=0, minute=0)
+    scheduler.add_job(func=_scheduled_age_refresh, trigger="cron", hour=0, minute=5)
     scheduler.start()
 
 # --------------------------
 # Update Age from DOB Logic
-def update_all_ages_from_dob():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Make sure the age column exists (safe to run multiple times)
-    cur.execute("PRAGMA table_info(actresses)")
-    columns = [info[1] for info in cur.fetchall()]
-    if 'age' not in columns:
-        cur.execute("ALTER TABLE actresses ADD COLUMN age INTEGER")
-        print("Added missing 'age' column")
-
-    # Fetch all rows that have a dob
-    cur.execute("SELECT id, dob FROM actresses WHERE dob IS NOT NULL AND TRIM(dob) != ''")
-    rows = cur.fetchall()
-
-    if not rows:
-        conn.close()
-        print("No DOBs found – nothing to update")
-        return
-
-    today = datetime.today()
-    updated = 0
-    skipped = 0
-
-    for row in rows:
-        actress_id = row['id']
-        raw = str(row['dob']).strip()
-
-        # Try many common formats
-        parsed = None
-        formats = [
-            '%Y/%m/%d', '%Y-%m-%d', '%Y.%m.%d',
-            '%Y/%m/%d', '%Y-%m-%d',                 # standard
-            '%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y',     # day-first (common in some countries)
-            '%Y%m%d', '%d%m%Y'                     # no separators
-        ]
-
-        for fmt in formats:
-            try:
-                parsed = datetime.strptime(raw, fmt)
-                break
-            except ValueError:
-                continue
-
-        # Last resort: extract numbers and guess YYYY-MM-DD or YYYY/MM/DD
-        if parsed is None:
-            import re
-            numbers = re.findall(r'\d+', raw)
-            if len(numbers) >= 3:
-                y, m, d = int(numbers[0]), int(numbers[1]), int(numbers[2])
-                if y < 100:  # probably DD-MM-YY
-                    y += 1900 if y >= 50 else 2000
-                if 1900 <= y <= datetime.now().year and 1 <= m <= 12 and 1 <= d <= 31:
-                    try:
-                        parsed = datetime(y, m, d)
-                    except ValueError:
-                        pass
-
-        if parsed is None:
-            print(f"Warning: Can't parse DOB for ID {actress_id}: '{raw}'")
-            skipped += 1
-            continue
-
-        # Calculate real age
-        age = today.year - parsed.year
-        if (today.month, today.day) < (parsed.month, parsed.day):
-            age -= 1
-
-        # Update database
-        cur.execute("UPDATE actresses SET age = ? WHERE id = ?", (age, actress_id))
-        updated += 1
-
-    conn.commit()
-    conn.close()
+# dob_iso is filled on every write (dob_fields), so this only re-parses DOBs that
+# never parsed, then recomputes every age with one set-based UPDATE.
+def update_all_ages_from_dob(progress=None):
+    cur = get_conn().cursor()
+    rows = cur.execute("SELECT id, dob FROM actresses WHERE dob_iso IS NULL AND dob IS NOT NULL AND TRIM(dob) != ''").fetchall()
+    if progress: progress(0, len(rows), 'Parsing DOBs')
+    parsed = [(iso, r['id']) for r in rows if (iso := parse_dob(r['dob']))]
+    cur.executemany('UPDATE actresses SET dob_iso=? WHERE id=?', parsed)
+    skipped = len(rows) - len(parsed)
+    if progress: progress(len(rows), len(rows), 'Updating ages')
+    updated = refresh_ages(full=True)
     print(f"Age update complete: {updated} actresses updated, {skipped} invalid DOBs skipped")
+    return {'updated': updated, 'skipped': skipped}
 
 ## Update Age from DOB Route
 @app.route('/update-ages')
 def route_update_ages():
+    if wants_job():
+        return job_response(submit_job('update_ages', lambda progress: update_all_ages_from_dob(progress)))
     update_all_ages_from_dob()
     return """
     <h2>All ages calculated and saved!</h2>
@@ -1259,6 +3500,31 @@ def route_update_ages():
     <a href="/">← Home</a>
     """
 
+# --------------------------
+# Background job status
+# --------------------------
+@app.route('/jobs')
+def list_jobs():
+    rows = _jobs_conn().execute('SELECT * FROM jobs ORDER BY created_at DESC LIMIT 50').fetchall()
+    return jsonify({'jobs': [_job_status(r) for r in rows]})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+@csrf.exempt
+def cancel_job_route(job_id):
+    # scripts may skip the token by POSTing a JSON body (e.g. {}); see protect_api_post
+    protect_api_post()
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
 # --------------------------
 # Run
 # --------------------------
@@ -0,0 +1,154 @@
+"""
+Startup benchmark for Actress Manager.
+
+Imports app.py in fresh interpreters (the way each gunicorn worker or `flask`
+CLI invocation does) and reports:
+- wall time of `import app` and the slowest modules it pulls in, from
+  `python -X importtime` (cumulative time, nested down to --depth)
+- resident memory (RSS) of the worker once the import has finished
+- whether any of the lazily loaded subsystems (reportlab, bs4, requests,
+  fuzzywuzzy, PIL) got pulled in at startup
+
+Usage:
+    python bench_startup.py                      # 5 runs against a scratch DB
+    python bench_startup.py --runs 10 --top 15
+    python bench_startup.py --touch pdf_export   # also measure first use of a feature
+    python bench_startup.py --max-import-ms 800 --max-rss-mb 80   # exit 1 on regression
+
+DB_PATH defaults to a throwaway database so the run does not migrate or scan a
+real library; pass --db to benchmark against one.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Must not be imported by `import app`; see the lazy imports in app.py
+LAZY_MODULES = ('reportlab', 'bs4', 'requests', 'fuzzywuzzy', 'PIL')
+
+CHILD = r'''
+import json, os, sys, time
+def rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+t = time.perf_counter()
+import app
+import_s = time.perf_counter() - t
+rss = rss_kb()
+loaded = sorted(m for m in %r if m in sys.modules)
+touched = {}
+for name in sys.argv[1:]:
+    t = time.perf_counter()
+    __import__(name)
+    touched[name] = time.perf_counter() - t
+print(json.dumps({'import_s': import_s, 'rss_kb': rss, 'lazy_loaded': loaded, 'touched': touched}))
+''' % (LAZY_MODULES,)
+
+
+def parse_importtime(stderr):
+    """[(cumulative_us, self_us, depth, module)] from `-X importtime` output, in its order (children before parents)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+        name = module.lstrip()
+        depth = (len(module) - len(name) - 1) // 2  # two spaces per nesting level after the leading one
+        rows.append((int(cumulative_us), int(self_us), depth, name.rstrip()))
+    return rows
+
+
+def imports_under(rows, parent='app'):
+    """
+    The rows nested under parent's top-level import, with depth relative to it.
+    importtime prints a module after everything it imported, so those are the
+    deeper rows just before it.
+    """
+    for i, (_, _, depth, module) in enumerate(rows):
+        if module == parent and depth == 0:
+            children = []
+            for cumulative_us, self_us, d, name in reversed(rows[:i]):
+                if d == 0:
+                    break
+                children.append((cumulative_us, self_us, d, name))
+            return children[::-1]
+    return []
+
+
+def run_once(env, touch):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, *touch],
+                          cwd=BASE_DIR, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f'import app failed (exit {proc.returncode})')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result['imports'] = parse_importtime(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports under app to list.')
+    parser.add_argument('--depth', type=int, default=2, help='Nesting levels under app to include (1 = its direct imports).')
+    parser.add_argument('--db', help='DB_PATH to import against (default: scratch database).')
+    parser.add_argument('--touch', action='append', default=[], metavar='MODULE',
+                        help='Also import MODULE after app (e.g. pdf_export, social_sync, name_matching).')
+    parser.add_argument('--max-import-ms', type=float, help='Fail if median import time exceeds this.')
+    parser.add_argument('--max-rss-mb', type=float, help='Fail if median RSS exceeds this.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ)
+        env.setdefault('MEDIA_ROOT', os.path.join(scratch, 'media'))
+        env.setdefault('THUMB_CACHE_DIR', os.path.join(scratch, 'thumb_cache'))
+        env.setdefault('PDF_CACHE_DIR', os.path.join(scratch, 'pdf_cache'))
+        env['DB_PATH'] = args.db or os.path.join(scratch, 'bench.db')
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+        if not args.db:
+            run_once(env, [])  # create the scratch schema so runs measure a warm start
+        results = [run_once(env, args.touch) for _ in range(args.runs)]
+
+    import_ms = statistics.median(r['import_s'] for r in results) * 1000
+    rss_mb = statistics.median(r['rss_kb'] for r in results) / 1024
+    print(f'import app: median {import_ms:.1f} ms, min {min(r["import_s"] for r in results) * 1000:.1f} ms over {len(results)} runs')
+    print(f'worker RSS after import: median {rss_mb:.1f} MB')
+    for name in args.touch:
+        print(f'first use of {name}: median {statistics.median(r["touched"][name] for r in results) * 1000:.1f} ms')
+
+    nested = [r for r in imports_under(results[-1]['imports']) if r[2] <= args.depth]
+    print(f'slowest imports under app, depth <= {args.depth} (last run, -X importtime cumulative):')
+    for cumulative_us, self_us, depth, module in sorted(nested, reverse=True)[:args.top]:
+        print(f'  {cumulative_us / 1000:8.1f} ms  {"  " * (depth - 1)}{module}')
+
+    failed = False
+    eager = results[-1]['lazy_loaded']
+    if eager:
+        print(f'FAIL: imported at startup but should load lazily: {", ".join(eager)}')
+        failed = True
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f'FAIL: import time {import_ms:.1f} ms > {args.max_import_ms} ms')
+        failed = True
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        print(f'FAIL: RSS {rss_mb:.1f} MB > {args.max_rss_mb} MB')
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""
+Fuzzy name comparison for duplicate checks and merge candidates.
+
+fuzzywuzzy (and python-Levenshtein under it) is imported here rather than in
+app.py so it is only loaded once a feature actually compares names.
+"""
+
+from fuzzywuzzy import fuzz  # pip install fuzzywuzzy python-levenshtein
+
+
+def name_ratio(a, b):
+    """0-100 similarity of two names (fuzz.ratio)."""
+    return fuzz.ratio(a, b)
+
+
+def score_pairs(pairs, min_score):
+    """
+    (id1, id2, score) for each (id1, name1, id2, name2) in pairs scoring above
+    min_score. Top-level so a process pool can run it on chunks of a shortlist.
+    """
+    scored = []
+    for id1, name1, id2, name2 in pairs:
+        score = fuzz.ratio(name1, name2)
+        if score > min_score:
+            scored.append((id1, id2, score))
+    return scored
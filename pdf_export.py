@@ -0,0 +1,59 @@
+"""
+PDF profile export for Actress Manager.
+
+reportlab is large and only needed when someone asks for a PDF, so the /pdf
+route imports this module on first use instead of app.py importing reportlab.
+render_profile_pdf is what the catalog export runs on its process pool.
+"""
+
+import io
+import os
+import uuid
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Image, Spacer
+from reportlab.lib.styles import getSampleStyleSheet
+# Optional: pypdf to concatenate cached profiles into one catalog PDF (zip export works without it)
+try:
+    from pypdf import PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+
+def profile_pdf(actress, thumb_path=None):
+    """Render one actress row (a dict) as PDF bytes, with the thumbnail if it exists."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    story = []
+    styles = getSampleStyleSheet()
+    story.append(Paragraph(actress['name'], styles['Title']))
+    if thumb_path and os.path.exists(thumb_path):
+        img = Image(thumb_path, width=2*inch, height=2*inch)
+        story.append(img)
+    story.append(Spacer(1, 12))
+    for key, value in actress.items():
+        if value and key not in ('id', 'folder_name'):
+            story.append(Paragraph(f"<b>{key.replace('_', ' ').title()}:</b> {value}", styles['Normal']))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_profile_pdf(actress, thumb_path, dest_path):
+    """Write profile_pdf to dest_path, atomically so readers never see a partial file. Returns bytes written."""
+    data = profile_pdf(actress, thumb_path)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f'{dest_path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, dest_path)
+    return len(data)
+
+
+def merge_pdfs(paths, out):
+    """Concatenate the PDF files in paths into the binary file object out (needs pypdf)."""
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+    writer.write(out)
@@ -0,0 +1,245 @@
+"""
+Social media sync and web scraping for Actress Manager.
+
+Imported on first use by the /sync_social and /scrape routes so that requests
+and BeautifulSoup are not loaded by every worker at startup.
+
+All outbound calls go through fetch(): every request has a timeout, can share a
+pooled keep-alive Session, is spaced per host by a HostRateLimiter, and backs
+off on 429/5xx. Base URLs come from TWITTER_API_URL / INSTAGRAM_URL /
+WIKIPEDIA_API_URL so the
+whole module can be pointed at a local stub server.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit, quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+TWITTER_API_URL = os.getenv('TWITTER_API_URL', 'https://api.twitter.com')
+INSTAGRAM_URL = os.getenv('INSTAGRAM_URL', 'https://www.instagram.com')
+WIKIPEDIA_API_URL = os.getenv('WIKIPEDIA_API_URL', 'https://en.wikipedia.org/api/rest_v1')
+USER_AGENT = 'ActressManager/1.0 (https://github.com/Tonisark/ActressManager)'  # Wikimedia asks for a descriptive agent
+REQUEST_TIMEOUT = (5, 15)   # connect, read (seconds)
+TWITTER_BATCH = 100         # usernames per /2/users/by call, the API maximum
+# seconds between requests to one host; /2/users/by allows 300 calls per 15 min
+HOST_MIN_INTERVAL = {'api.twitter.com': 3.0, 'www.instagram.com': 2.0, 'en.wikipedia.org': 0.05}
+DEFAULT_MIN_INTERVAL = 0.0
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0          # seconds, doubled per attempt unless the server says otherwise
+MAX_BACKOFF = 900.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to each host at least its interval apart, across threads.
+    backoff() pushes a host's next slot out, so one 429 slows every worker
+    talking to that host, not just the one that got it.
+    """
+    def __init__(self, intervals=None, default=DEFAULT_MIN_INTERVAL):
+        self.intervals = dict(HOST_MIN_INTERVAL if intervals is None else intervals)
+        self.default = default
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + self.intervals.get(host, self.default)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def backoff(self, host, delay):
+        with self._lock:
+            self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + delay)
+
+
+def make_session(pool_size=10):
+    """requests.Session keeping up to pool_size keep-alive connections per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _retry_delay(resp, attempt):
+    retry_after = resp.headers.get('Retry-After')
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_BACKOFF)
+        except ValueError:
+            try:
+                return min(max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()), MAX_BACKOFF)
+            except (TypeError, ValueError):
+                pass
+    reset = resp.headers.get('x-rate-limit-reset')  # Twitter: epoch seconds when the window reopens
+    if resp.status_code == 429 and reset and reset.isdigit():
+        return min(max(0.0, int(reset) - time.time()), MAX_BACKOFF)
+    return min(BACKOFF_BASE * 2 ** attempt, MAX_BACKOFF)
+
+
+def fetch(url, session=None, limiter=None, **kwargs):
+    """
+    GET url with REQUEST_TIMEOUT, waiting on limiter for the host and retrying
+    429/5xx responses and connection errors with backoff. Returns the last response;
+    raises the last connection error once MAX_RETRIES is exhausted.
+    """
+    http = session or requests
+    host = urlsplit(url).hostname
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+    for attempt in range(MAX_RETRIES + 1):
+        if limiter:
+            limiter.wait(host)
+        try:
+            resp = http.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = min(BACKOFF_BASE * 2 ** attempt, MAX_BACKOFF)
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == MAX_RETRIES:
+                return resp
+            delay = _retry_delay(resp, attempt)
+        if limiter:
+            limiter.backoff(host, delay)
+        else:
+            time.sleep(delay)
+
+
+def _twitter_user(data):
+    return {
+        'followers_count': data.get('public_metrics', {}).get('followers_count', 0),
+        'description': data.get('description', ''),
+        'verified': data.get('verified', False)
+    }
+
+
+def sync_twitter(username, bearer, session=None, limiter=None):
+    if not bearer:
+        return {'error': 'Twitter bearer token not set'}
+    headers = {'Authorization': f'Bearer {bearer}'}
+    url = f'{TWITTER_API_URL}/2/users/by/username/{quote(username)}?user.fields=public_metrics,description'
+    resp = fetch(url, session, limiter, headers=headers)
+    if resp.status_code == 200 and 'data' in resp.json():
+        return _twitter_user(resp.json()['data'])
+    return {'error': resp.text}
+
+
+def sync_twitter_batch(usernames, bearer, session=None, limiter=None):
+    """
+    Look up to TWITTER_BATCH usernames with one /2/users/by call.
+    Returns {lowercased username: sync_twitter-style result}.
+    """
+    if not bearer:
+        return {u.lower(): {'error': 'Twitter bearer token not set'} for u in usernames}
+    headers = {'Authorization': f'Bearer {bearer}'}
+    url = f'{TWITTER_API_URL}/2/users/by'
+    params = {'usernames': ','.join(usernames), 'user.fields': 'public_metrics,description'}
+    resp = fetch(url, session, limiter, headers=headers, params=params)
+    if resp.status_code != 200:
+        return {u.lower(): {'error': resp.text} for u in usernames}
+    body = resp.json()
+    results = {u['username'].lower(): _twitter_user(u) for u in body.get('data', [])}
+    for err in body.get('errors', []):
+        results.setdefault(str(err.get('value', '')).lower(), {'error': err.get('detail', 'Not found')})
+    for u in usernames:
+        results.setdefault(u.lower(), {'error': 'Not returned'})
+    return results
+
+
+def sync_instagram(username, session=None, limiter=None):
+    url = f'{INSTAGRAM_URL}/{quote(username)}/'
+    resp = fetch(url, session, limiter)
+    if resp.status_code == 200:
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        script = soup.find('script', string=lambda t: t and 'window._sharedData' in t)
+        if script:
+            # Note: Instagram structure may change; this is a basic scrape
+            data = json.loads(script.string.split('window._sharedData = ')[1].strip().rstrip(';'))
+            user = data['entry_data']['ProfilePage'][0]['graphql']['user']
+            return {
+                'followers_count': user['edge_followed_by']['count'],
+                'biography': user['biography'],
+                'is_verified': user['is_verified']
+            }
+    return {'error': 'Failed to fetch'}
+
+
+def bulk_sync(profiles, bearer, workers=8, limiter=None, progress=None):
+    """
+    Refresh follower counts for many profiles at once.
+
+    profiles is an iterable of (actress_id, twitter_handle, instagram_handle),
+    handles without '@' and possibly None. Twitter handles are looked up
+    TWITTER_BATCH at a time; Instagram pages are fetched one per task. Both run
+    on a pool of workers threads sharing one keep-alive Session and limiter.
+    progress(done, total) is called as tasks finish.
+
+    Returns ({actress_id: {'twitter_followers': n, 'ig_followers': n}}, {actress_id: [error, ...]}).
+    """
+    limiter = limiter or HostRateLimiter()
+    twitter, instagram = {}, []
+    for actress_id, tw, ig in profiles:
+        if tw:
+            twitter.setdefault(tw.lower(), []).append(actress_id)
+        if ig:
+            instagram.append((actress_id, ig))
+    handles = list(twitter)
+    batches = [handles[i:i + TWITTER_BATCH] for i in range(0, len(handles), TWITTER_BATCH)]
+    updates, errors = {}, {}
+
+    def record(actress_id, key, result):
+        if 'error' in result:
+            errors.setdefault(actress_id, []).append(f"{key}: {result['error']}"[:200])
+        else:
+            updates.setdefault(actress_id, {})[key] = result['followers_count']
+
+    session = make_session(workers)
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='social')
+    try:
+        futures = {pool.submit(sync_twitter_batch, batch, bearer, session, limiter): ('twitter', batch) for batch in batches}
+        futures.update({pool.submit(sync_instagram, ig, session, limiter): ('instagram', actress_id)
+                        for actress_id, ig in instagram})
+        for done, fut in enumerate(as_completed(futures), 1):
+            kind, target = futures[fut]
+            try:
+                result = fut.result()
+            except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+                failed = {'error': f'{type(e).__name__}: {e}'}
+                result = {handle: failed for handle in target} if kind == 'twitter' else failed
+            if kind == 'twitter':
+                for handle in target:
+                    for actress_id in twitter[handle]:
+                        record(actress_id, 'twitter_followers', result[handle])
+            else:
+                record(target, 'ig_followers', result)
+            if progress:
+                progress(done, len(futures))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        session.close()
+    return updates, errors
+
+
+def wikipedia_lookup(name, session=None, limiter=None):
+    """
+    First 500 characters of the Wikipedia summary for name, or None when there
+    is no such page (or it has no extract). Raises on network and server errors,
+    so callers can tell "no article" (cacheable) from "could not ask".
+    """
+    url = f"{WIKIPEDIA_API_URL}/page/summary/{quote(name.replace(' ', '_'), safe='')}"
+    resp = fetch(url, session, limiter, headers={'User-Agent': USER_AGENT})
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json().get('extract', '')[:500] or None
@@ -0,0 +1,20 @@
+"""
+Point app.py at a scratch database and media tree before it is imported:
+config is read and ensure_schema() runs at import time.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+SCRATCH = tempfile.mkdtemp(prefix='actress-tests-')
+atexit.register(shutil.rmtree, SCRATCH, ignore_errors=True)
+os.environ.update(
+    DB_PATH=os.path.join(SCRATCH, 'actresses.db'),
+    MEDIA_ROOT=os.path.join(SCRATCH, 'media'),
+    THUMB_CACHE_DIR=os.path.join(SCRATCH, 'thumb_cache'),
+    PDF_CACHE_DIR=os.path.join(SCRATCH, 'pdf_cache'),
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,37 @@
+"""Request validation on the JSON API routes."""
+
+import pytest
+from flask import session
+from flask_wtf.csrf import generate_csrf
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize('payload', [['a', 'b'], 'a', 1, {'names': 'a'}, {'names': []}, {'names': [1]}])
+def test_scrape_batch_rejects_malformed_json(client, payload):
+    resp = client.post('/scrape_batch', json=payload)
+    assert resp.status_code == 400
+    assert 'error' in resp.get_json()
+
+
+def test_cancel_without_json_or_token_is_refused(client):
+    assert client.post('/jobs/nope/cancel').status_code == 400
+    assert client.post('/jobs/nope/cancel', data='x', content_type='text/plain').status_code == 400
+
+
+def test_cancel_with_json_body_skips_token(client):
+    assert client.post('/jobs/nope/cancel', json={}).status_code == 404
+
+
+def test_cancel_with_token_header(client):
+    with app.app.test_request_context():
+        token = generate_csrf()
+        raw = session['csrf_token']
+    with client.session_transaction() as sess:
+        sess['csrf_token'] = raw
+    assert client.post('/jobs/nope/cancel', headers={'X-CSRFToken': token}).status_code == 404
@@ -0,0 +1,66 @@
+"""get_conn() reuse and reopen_if_db_replaced() when DB_PATH is swapped on disk."""
+
+import os
+import sqlite3
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / 'db.sqlite'
+    sqlite3.connect(path).close()
+    monkeypatch.setattr(app, 'DB_PATH', str(path))
+    app.close_conn()
+    yield path
+    app.close_conn()
+
+
+def replace_file(path, marker):
+    other = path.with_name('other.sqlite')
+    with sqlite3.connect(other) as conn:
+        conn.execute(f'CREATE TABLE {marker} (x)')
+    conn.close()
+    os.replace(other, path)
+
+
+def test_get_conn_does_not_stat(db_path, monkeypatch):
+    conn = app.get_conn()
+    monkeypatch.setattr(app, '_db_file_id', lambda: pytest.fail('get_conn() must not stat DB_PATH'))
+    assert app.get_conn() is conn
+
+
+def test_reopens_after_replace(db_path):
+    conn = app.get_conn()
+    app.reopen_if_db_replaced()
+    assert app.get_conn() is conn
+    replace_file(db_path, 'swapped')
+    app.reopen_if_db_replaced()
+    assert app.get_conn() is not conn
+    assert app.get_conn().execute("SELECT 1 FROM sqlite_master WHERE name = 'swapped'").fetchone()
+
+
+def test_open_transaction_is_rolled_back_not_committed(db_path):
+    conn = app.get_conn()
+    conn.execute('CREATE TABLE t (x)')
+    conn.commit()
+    conn.execute('INSERT INTO t VALUES (1)')
+    assert conn.in_transaction
+    replace_file(db_path, 'swapped')
+    app.reopen_if_db_replaced()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')  # closed, after an explicit rollback
+
+
+def test_request_stats_once(db_path, monkeypatch):
+    app.get_conn()
+    calls = []
+    real = app._db_file_id
+    monkeypatch.setattr(app, '_db_file_id', lambda: calls.append(1) or real())
+    with app.app.test_request_context():
+        app.app.preprocess_request()
+        for _ in range(5):
+            app.get_conn()
+    assert len(calls) == 1
@@ -0,0 +1,83 @@
+"""/media caching and range handling: strong ETag, 304, 206, 416, If-Range, ?v= immutability, proxy offload."""
+
+import os
+
+import pytest
+
+import app
+
+BODY = bytes(range(256)) * 16
+
+
+@pytest.fixture
+def probe(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'MEDIA_ROOT', str(tmp_path))
+    monkeypatch.setattr(app, 'MEDIA_OFFLOAD', '')
+    (tmp_path / 'folder').mkdir()
+    path = tmp_path / 'folder' / 'probe.bin'
+    path.write_bytes(BODY)
+    return '/media/folder/probe.bin', os.stat(path)
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_full_get_has_strong_etag(client, probe):
+    url, st = probe
+    resp = client.get(url)
+    etag, weak = resp.get_etag()
+    assert resp.status_code == 200 and resp.data == BODY
+    assert etag == app.media_version(st.st_mtime, st.st_size) and not weak
+    assert resp.headers['Accept-Ranges'] == 'bytes'
+    assert resp.cache_control.max_age == app.MEDIA_MAX_AGE and not resp.cache_control.immutable
+
+
+def test_if_none_match_answers_304(client, probe):
+    url, _ = probe
+    etag = client.get(url).headers['ETag']
+    resp = client.get(url, headers={'If-None-Match': etag})
+    assert resp.status_code == 304 and resp.data == b''
+
+
+def test_range_answers_206(client, probe):
+    url, _ = probe
+    resp = client.get(url, headers={'Range': 'bytes=100-199'})
+    assert resp.status_code == 206
+    assert resp.data == BODY[100:200]
+    assert resp.headers['Content-Range'] == f'bytes 100-199/{len(BODY)}'
+
+
+def test_range_past_end_answers_416(client, probe):
+    url, _ = probe
+    resp = client.get(url, headers={'Range': f'bytes={len(BODY)}-'})
+    assert resp.status_code == 416
+
+
+def test_stale_if_range_sends_whole_file(client, probe):
+    url, _ = probe
+    resp = client.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert resp.status_code == 200 and resp.data == BODY
+
+
+def test_current_version_is_immutable(client, probe):
+    url, st = probe
+    resp = client.get(url, query_string={'v': app.media_version(st.st_mtime, st.st_size)})
+    assert resp.cache_control.immutable and resp.cache_control.max_age == app.MEDIA_IMMUTABLE_MAX_AGE
+    resp = client.get(url, query_string={'v': 'stale'})
+    assert not resp.cache_control.immutable
+
+
+def test_path_outside_media_root_is_404(client, probe):
+    assert client.get('/media/../conftest.py').status_code == 404
+    assert client.get('/media/folder/missing.bin').status_code == 404
+
+
+@pytest.mark.parametrize('mode, header', [('x-accel', 'X-Accel-Redirect'), ('x-sendfile', 'X-Sendfile')])
+def test_offload_hands_transfer_to_proxy(client, probe, monkeypatch, mode, header):
+    monkeypatch.setattr(app, 'MEDIA_OFFLOAD', mode)
+    url, _ = probe
+    resp = client.get(url)
+    assert resp.status_code == 200 and resp.data == b'' and header in resp.headers
+    assert client.get(url, headers={'If-None-Match': resp.headers['ETag']}).status_code == 304
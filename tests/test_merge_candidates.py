@@ -0,0 +1,61 @@
+"""Incremental refresh_merge_candidates() matches a full pass, however many ids are queued."""
+
+import random
+import sqlite3
+
+import pytest
+
+import app
+
+ROWS = 5000
+RENAMED = 1200  # past 999 bound variables, under the quarter of the table that forces a full pass
+
+
+def random_name(rng, taken):
+    # mostly unrelated names, with one in five a one-letter variant of an earlier name
+    if taken and rng.random() < 0.2:
+        base = list(rng.choice(taken))
+        base[rng.randrange(len(base))] = rng.choice('aeiou')
+        return ''.join(base)
+    return ' '.join(''.join(rng.choice('bcdfgklmnprstvz') + rng.choice('aeiou') for _ in range(3)).title()
+                    for _ in range(2))
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'DB_PATH', str(tmp_path / 'merge.sqlite'))
+    app.close_conn()
+    with app.app.app_context():
+        app.ensure_schema()
+        yield app.get_conn()
+    app.close_conn()
+
+
+def candidates(conn):
+    return sorted(tuple(r) for r in conn.execute('SELECT id1, id2, score FROM merge_candidates'))
+
+
+def test_incremental_matches_full(conn):
+    rng = random.Random(0)
+    names = []
+    for _ in range(ROWS):
+        names.append(random_name(rng, names))
+    with app.transaction():
+        conn.executemany('INSERT INTO actresses (name) VALUES (?)', [(n,) for n in names])
+    with app.transaction():
+        app.refresh_merge_candidates(workers=1)
+    with app.transaction():
+        conn.executemany('UPDATE actresses SET name=? WHERE id=?',
+                         [(random_name(rng, names), i) for i in rng.sample(range(1, ROWS + 1), RENAMED)])
+    assert conn.execute('SELECT COUNT(*) FROM merge_dirty').fetchone()[0] == RENAMED
+
+    conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    with app.transaction():
+        assert app.refresh_merge_candidates(workers=1) == RENAMED
+    assert conn.execute('SELECT COUNT(*) FROM merge_dirty').fetchone()[0] == 0
+    incremental = candidates(conn)
+    assert incremental
+
+    with app.transaction():
+        app.refresh_merge_candidates(full=True, workers=1)
+    assert incremental == candidates(conn)